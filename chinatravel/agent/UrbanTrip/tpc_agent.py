@@ -9,7 +9,7 @@ from datetime import datetime, timedelta
 import random
 import re
 import ast
-from geopy.distance import geodesic
+from chinatravel.environment.distance import distance as geo_distance, one_to_many
 
 sys.path.append("./../../../")
 project_root_path = os.path.dirname(
@@ -40,6 +40,8 @@ from chinatravel.symbol_verification.hard_constraint import (
     evaluate_constraints_py,
 )
 from chinatravel.symbol_verification.preference import evaluate_preference_py
+from chinatravel.symbol_verification.plan_prefix import PlanPrefix
+from chinatravel.symbol_verification.plan_features import PlanFeatures
 from chinatravel.environment.tools.poi.apis import Poi
 
 from agent.nesy_verifier.verifier.commonsense_constraint_nl import collect_commonsense_constraints_error
@@ -157,6 +159,8 @@ class UrbanTrip(BaseAgent):
         self.spot_type_visiting = []  # 正在访问的景点类型列表
         self.attraction_names_visiting = []  # 正在访问的景点名称列表
         self.restaurant_names_visiting = []  # 正在访问的餐厅名称列表
+        self.visit_keys_cache = {}
+        self.plan_prefix = PlanPrefix(self.visit_keys)  # 当前部分计划的累计费用与访问记录
 
         self.llm_rec_format_error = 0  # llm推荐格式错误计数
         self.llm_rec_count = 0  # llm推荐计数
@@ -716,6 +720,7 @@ class UrbanTrip(BaseAgent):
         print(f"current_position: {current_position}")
 
         print(self.backtrack_count)
+        self.plan_prefix.sync(plan)
         # if self.backtrack_count > 5800 or time.time() - self.time_before_search + 20 > self.TIME_CUT + self.llm_inference_time_count:
         #     self.too_many_backtrack = True
         if time.time() - self.time_before_search + 20 > self.TIME_CUT + self.llm_inference_time_count:
@@ -1076,11 +1081,8 @@ class UrbanTrip(BaseAgent):
                         # 有预算要求，按price从低到高排序
                         candidate_attr_ranked = candidate_res_filtered.sort_values(by="price").reset_index(drop=True)
                     else:
-                        candidate_res_filtered["distance"] = candidate_res_filtered.apply(
-                            lambda row: self.calculate_distance(
-                                query, current_position, row["name"]
-                            ),
-                            axis=1
+                        candidate_res_filtered["distance"] = self.calculate_distances(
+                            query, current_position, candidate_res_filtered["name"]
                         )
                         candidate_attr_ranked = candidate_res_filtered.sort_values(by="distance").reset_index(drop=True)
 
@@ -1684,11 +1686,8 @@ class UrbanTrip(BaseAgent):
                     else:
                         print("sorted by distance")
                         # 根据current_position计算距离景点的距离并排序
-                        candidate_attr_filtered["distance"] = candidate_attr_filtered.apply(
-                            lambda row: self.calculate_distance(
-                                query, current_position, row["name"]
-                            ),
-                            axis=1
+                        candidate_attr_filtered["distance"] = self.calculate_distances(
+                            query, current_position, candidate_attr_filtered["name"]
                         )
                         candidate_attr_ranked = candidate_attr_filtered.sort_values(by="distance").reset_index(
                             drop=True)
@@ -2475,28 +2474,16 @@ class UrbanTrip(BaseAgent):
         return False, plan
 
     def check_constraint(self, plan, constraints):
-        # 初始化访问记录
-        visited_attractions = set()
-        visited_attraction_types = set()
-        visited_restaurants = set()
-        visited_restaurant_types = set()
+        prefix = self.plan_prefix.sync(plan)
 
         logic_fail = False
         backtrack = False
 
-        overall_cost = 0
-        attraction_cost = 0
-        restaurant_cost = 0
-        innercity_cost = 0
-        for day_activities in plan:
-            for activity in day_activities["activities"]:
-                if activity["type"] in ["breakfast", "lunch", "dinner", "attraction"]:
-                    overall_cost += activity["cost"]
-                    restaurant_cost += activity["cost"]
-                if activity["type"] in ["attraction"]:
-                    overall_cost += activity["cost"]
-                    attraction_cost += activity["cost"]
-                innercity_cost += sum(transport.get("cost", 0) for transport in activity.get("transports", []))
+        # 景点费用同时计入 restaurant_cost 与 overall_cost（与原逐项累加一致）
+        attraction_cost = prefix.attraction_cost
+        restaurant_cost = prefix.poi_cost
+        innercity_cost = prefix.innercity_cost
+        overall_cost = prefix.poi_cost + attraction_cost
         self.overall_cost = overall_cost + innercity_cost + self.hotel_cost + self.intercity_cost
         # print(f"overall cost: {self.overall_cost}, attraction cost:{attraction_cost}, restaurant cost: {restaurant_cost}, innercity cost: {innercity_cost}")
 
@@ -2525,75 +2512,28 @@ class UrbanTrip(BaseAgent):
             backtrack = True
             self.all_satisfy_flag = False
 
-        # 遍历活动，统计信息并处理 must_not 类约束 & only_free_attractions
-        for day in plan:
-            for act in day["activities"]:
-                poi_name = act.get("position")
-                poi_info = None
-
-                if act.get("type") == "attraction":
-                    match = self.memory["attractions"][self.memory["attractions"]["name"] == poi_name]
-                    if not match.empty:
-                        poi_info = match.iloc[0].to_dict()
-                        visited_attractions.add(poi_info["name"])
-                        visited_attraction_types.add(poi_info["type"])
-
-                        # must_not_see_attraction
-                        if "must_not_see_attraction" in constraints:
-                            if poi_info["name"] in constraints["must_not_see_attraction"]:
-                                print("visited must_not_see_attraction")
-                                backtrack = True
-
-                        # must_not_see_attraction_type
-                        if "must_not_see_attraction_type" in constraints:
-                            if poi_info["type"] in constraints["must_not_see_attraction_type"]:
-                                print("visited must_not_see_attraction_type")
-                                backtrack = True
-
-                        # only_free_attractions
-                        if "only_free_attractions" in constraints and poi_info.get("price", 0) > 0:
-                            print("only_free_attractions but not free")
-                            backtrack = True
-
-                elif act.get("type") in {"lunch", "dinner"}:
-                    match = self.memory["restaurants"][self.memory["restaurants"]["name"] == poi_name]
-                    if not match.empty:
-                        poi_info = match.iloc[0].to_dict()
-                        visited_restaurants.add(poi_info["name"])
-                        visited_restaurant_types.add(poi_info["cuisine"])
-
-                        # must_not_visit_restaurant
-                        if "must_not_visit_restaurant" in constraints:
-                            if poi_info["name"] in constraints["must_not_visit_restaurant"]:
-                                print("visited must_not_visit_restaurant")
-                                backtrack = True
-
-                        # must_not_visit_restaurant_type
-                        if "must_not_visit_restaurant_type" in constraints:
-                            if poi_info["cuisine"] in constraints["must_not_visit_restaurant_type"]:
-                                print("visited must_not_visit_restaurant_type")
-                                backtrack = True
+        # 已确定的约束：must_not 类 & only_free_attractions 一旦违反就回溯
+        decided = prefix.decided(constraints)
+        for key, message in (
+            ("must_not_see_attraction", "visited must_not_see_attraction"),
+            ("must_not_see_attraction_type", "visited must_not_see_attraction_type"),
+            ("only_free_attractions", "only_free_attractions but not free"),
+            ("must_not_visit_restaurant", "visited must_not_visit_restaurant"),
+            ("must_not_visit_restaurant_type", "visited must_not_visit_restaurant_type"),
+        ):
+            if decided.get(key) is False:
+                print(message)
+                backtrack = True
 
         # 遍历 must 类要求，统计是否满足
         # 注意：这些不满足不立即回溯，而是给机会后续补上
-        if "must_see_attraction" in constraints:
-            required = set(constraints["must_see_attraction"])
-            if not required.issubset(visited_attractions):
-                logic_fail = True
-
-        if "must_see_attraction_type" in constraints:
-            required = set(constraints["must_see_attraction_type"])
-            if not required.issubset(visited_attraction_types):
-                logic_fail = True
-
-        if "must_visit_restaurant" in constraints:
-            required = set(constraints["must_visit_restaurant"])
-            if not required.issubset(visited_restaurants):
-                logic_fail = True
-
-        if "must_visit_restaurant_type" in constraints:
-            required = set(constraints["must_visit_restaurant_type"])
-            if not required.issubset(visited_restaurant_types):
+        for key in (
+            "must_see_attraction",
+            "must_see_attraction_type",
+            "must_visit_restaurant",
+            "must_visit_restaurant_type",
+        ):
+            if key in constraints and not decided.get(key):
                 logic_fail = True
 
         if "must_innercity_transport" in constraints:
@@ -2606,6 +2546,27 @@ class UrbanTrip(BaseAgent):
 
         return (not backtrack) and (not logic_fail), backtrack
 
+    def visit_keys(self, activity):
+        """PlanPrefix 的附加访问键：景点类型、收费景点、餐厅菜系（按名称查一次）"""
+        poi_type, name = activity.get("type"), activity.get("position")
+        keys = self.visit_keys_cache.get((poi_type, name))
+        if keys is not None:
+            return keys
+        keys = []
+        if poi_type == "attraction":
+            match = self.memory["attractions"][self.memory["attractions"]["name"] == name]
+            if not match.empty:
+                poi_info = match.iloc[0].to_dict()
+                keys.append(("attraction_type", poi_info["type"]))
+                if poi_info.get("price", 0) > 0:
+                    keys.append(("paid_attraction", name))
+        elif poi_type in {"lunch", "dinner"}:
+            match = self.memory["restaurants"][self.memory["restaurants"]["name"] == name]
+            if not match.empty:
+                keys.append(("cuisine", match.iloc[0]["cuisine"]))
+        self.visit_keys_cache[poi_type, name] = keys
+        return keys
+
     def check_requirement(self, plan):
         if self.all_satisfy:
             # 情况1：必须全部满足
@@ -2627,19 +2588,11 @@ class UrbanTrip(BaseAgent):
             return False, False  # 所有组都不满足
 
     def check_budgets(self, plan):
-        overall_cost = 0
-        attraction_cost = 0
-        restaurant_cost = 0
-        innercity_cost = 0
-        for day_activities in plan:
-            for activity in day_activities["activities"]:
-                if activity["type"] in ["breakfast", "lunch", "dinner", "attraction"]:
-                    overall_cost += activity["cost"]
-                    restaurant_cost += activity["cost"]
-                if activity["type"] in ["attraction"]:
-                    overall_cost += activity["cost"]
-                    attraction_cost += activity["cost"]
-                innercity_cost += sum(transport.get("cost", 0) for transport in activity.get("transports", []))
+        prefix = self.plan_prefix.sync(plan)
+        attraction_cost = prefix.attraction_cost
+        restaurant_cost = prefix.poi_cost
+        innercity_cost = prefix.innercity_cost
+        overall_cost = prefix.poi_cost + attraction_cost
         self.overall_cost = overall_cost + innercity_cost + self.hotel_cost + self.intercity_cost
 
         if self.attraction_budget is not None and self.attraction_budget < attraction_cost:
@@ -2675,9 +2628,22 @@ class UrbanTrip(BaseAgent):
 
         locationA, locationB = coordinate_A, coordinate_B
 
-        distance = geodesic(locationA, locationB).kilometers
+        distance = geo_distance(locationA, locationB)
         return distance
 
+    def calculate_distances(self, query, start, ends):
+        """
+        `calculate_distance` from `start` to each of `ends`, in one batch
+        """
+        city = query["target_city"]
+        coordinate_A = self.poi_search.search(city, start)
+        coordinates = [self.poi_search.search(city, end) for end in ends]
+        if not isinstance(coordinate_A, tuple) or not all(
+            isinstance(coordinate, tuple) for coordinate in coordinates
+        ):
+            return [self.calculate_distance(query, start, end) for end in ends]
+        return one_to_many(coordinate_A, coordinates).tolist()
+
     def get_transport_by_distance(self, distance):
         selected_modes = []
 
@@ -3087,7 +3053,10 @@ class UrbanTrip(BaseAgent):
 
         self.least_plan_schema = deepcopy(res_plan)
 
-        bool_result = func_commonsense_constraints(query, res_plan, verbose=True)
+        features = PlanFeatures(res_plan, query["target_city"])
+        bool_result = func_commonsense_constraints(
+            query, res_plan, verbose=True, features=features
+        )
 
         # if not bool_result:
         #     exit(0)
@@ -3096,7 +3065,9 @@ class UrbanTrip(BaseAgent):
             self.commonsense_pass_count += 1
 
         try:
-            extracted_vars = get_symbolic_concepts(query, res_plan, need_ood=False)
+            extracted_vars = get_symbolic_concepts(
+                query, res_plan, need_ood=False, features=features
+            )
 
         except:
             extracted_vars = None
@@ -3445,36 +3416,16 @@ class UrbanTrip(BaseAgent):
         else:
             raise NotImplementedError
 
-        poi_info = self.env(
-            "{func}('{city}', 'name', lambda x: True)".format(func=func_name, city=city)
-        )["data"]
-        # print(poi_info)
-        while True:
-            info_i = self.env("next_page()")["data"]
-            if len(info_i) == 0:
-                break
-            else:
-                poi_info = pd.concat([poi_info, info_i], axis=0, ignore_index=True)
+        poi_info = self.env.call(func_name, city).all_pages()
 
         # print(poi_info)
         return poi_info
 
     def collect_innercity_transport(self, city, start, end, start_time, trans_type):
 
-        call_str = (
-            'goto("{city}", "{start}", "{end}", "{start_time}", "{trans_type}")'.format(
-                city=city,
-                start=start,
-                end=end,
-                start_time=start_time,
-                trans_type=trans_type,
-            )
-        )
-
-        # print(call_str)
         if start == end:
             return []
-        info = self.env(call_str)["data"]
+        info = self.env.call("goto", city, start, end, start_time, trans_type)["data"]
 
         # print(f"transport: {info}")
 
@@ -3499,20 +3450,11 @@ class UrbanTrip(BaseAgent):
 
     def collect_intercity_transport(self, source_city, target_city, trans_type):
 
-        info_return = self.env(
-            "intercity_transport_select('{source_city}', '{target_city}', '{trans_type}')".format(
-                source_city=source_city, target_city=target_city, trans_type=trans_type
-            )
+        info_return = self.env.call(
+            "intercity_transport_select", source_city, target_city, trans_type
         )
         if not info_return["success"]:
             return pd.DataFrame([])
-        trans_info = info_return["data"]
-        # print(poi_info)
-        while True:
-            info_i = self.env("next_page()")["data"]
-            if len(info_i) == 0:
-                break
-            else:
-                trans_info = pd.concat([trans_info, info_i], axis=0, ignore_index=True)
+        trans_info = info_return.all_pages()
         # print(poi_info)
         return trans_info
@@ -35,6 +35,8 @@ from chinatravel.symbol_verification.hard_constraint import (
     evaluate_constraints_py,
 )
 from chinatravel.symbol_verification.preference import evaluate_preference_py
+from chinatravel.symbol_verification.plan_prefix import PlanPrefix
+from chinatravel.symbol_verification.plan_features import PlanFeatures
 
 from chinatravel.symbol_verification.concept_func import *
 from chinatravel.agent.nesy_agent.nl2sl_hybrid import nl2sl_reflect
@@ -206,7 +208,10 @@ class NesyAgent(BaseAgent):
 
         self.least_plan_schema = deepcopy(res_plan)
 
-        bool_result = func_commonsense_constraints(query, res_plan, verbose=True)
+        features = PlanFeatures(res_plan, query["target_city"])
+        bool_result = func_commonsense_constraints(
+            query, res_plan, verbose=True, features=features
+        )
 
         # if not bool_result:
         #     exit(0)
@@ -215,7 +220,9 @@ class NesyAgent(BaseAgent):
             self.commonsense_pass_count += 1
 
         try:
-            extracted_vars = get_symbolic_concepts(query, res_plan, need_ood=False)
+            extracted_vars = get_symbolic_concepts(
+                query, res_plan, need_ood=False, features=features
+            )
 
         except:
             extracted_vars = None
@@ -905,6 +912,7 @@ class NesyAgent(BaseAgent):
     ):
 
         self.search_nodes += 1
+        prefix = self.plan_prefix.sync(plan)
         if (
             time.time() - self.time_before_search
             > self.TIME_CUT + self.llm_inference_time_count
@@ -920,16 +928,7 @@ class NesyAgent(BaseAgent):
             return False, plan
 
         if self.required_budget != None:
-            total_cost = 0
-            for day_activities in plan:
-                for activity in day_activities["activities"]:
-                    if activity["type"] in [
-                        "breakfast",
-                        "lunch",
-                        "dinner",
-                        "attraction",
-                    ]:
-                        total_cost += activity["cost"]
+            total_cost = prefix.poi_cost
 
             if total_cost + self.intercity_with_hotel_cost > self.required_budget:
                 self.backtrack_count += 1
@@ -989,13 +988,8 @@ class NesyAgent(BaseAgent):
                 return False, plan
 
         else:
-            haved_lunch_today, haved_dinner_today = False, False
-
-            for act_i in plan[current_day]["activities"]:
-                if act_i["type"] == "lunch":
-                    haved_lunch_today = True
-                if act_i["type"] == "dinner":
-                    haved_dinner_today = True
+            haved_lunch_today = prefix.has_meal(current_day, "lunch")
+            haved_dinner_today = prefix.has_meal(current_day, "dinner")
 
             candidates_type = ["attraction"]
             if not haved_lunch_today:
@@ -1545,6 +1539,7 @@ class NesyAgent(BaseAgent):
         self.spot_type_visiting = []
         self.attraction_names_visiting = []
         self.restaurant_names_visiting = []
+        self.plan_prefix = PlanPrefix()
         self.ranking_attractions_flag = False
         self.ranking_restaurants_flag = False
 
@@ -1772,20 +1767,9 @@ class NesyAgent(BaseAgent):
 
     def collect_innercity_transport(self, city, start, end, start_time, trans_type):
 
-        call_str = (
-            'goto("{city}", "{start}", "{end}", "{start_time}", "{trans_type}")'.format(
-                city=city,
-                start=start,
-                end=end,
-                start_time=start_time,
-                trans_type=trans_type,
-            )
-        )
-
-        # print(call_str)
         if start == end:
             return []
-        info = self.env(call_str)["data"]
+        info = self.env.call("goto", city, start, end, start_time, trans_type)["data"]
 
         # print(info)
 
@@ -1810,21 +1794,12 @@ class NesyAgent(BaseAgent):
 
     def collect_intercity_transport(self, source_city, target_city, trans_type):
 
-        info_return = self.env(
-            "intercity_transport_select('{source_city}', '{target_city}', '{trans_type}')".format(
-                source_city=source_city, target_city=target_city, trans_type=trans_type
-            )
+        info_return = self.env.call(
+            "intercity_transport_select", source_city, target_city, trans_type
         )
         if not info_return["success"]:
             return pd.DataFrame([])
-        trans_info = info_return["data"]
-        # print(poi_info)
-        while True:
-            info_i = self.env("next_page()")["data"]
-            if len(info_i) == 0:
-                break
-            else:
-                trans_info = pd.concat([trans_info, info_i], axis=0, ignore_index=True)
+        trans_info = info_return.all_pages()
         # print(poi_info)
         return trans_info
 
@@ -1839,16 +1814,7 @@ class NesyAgent(BaseAgent):
         else:
             raise NotImplementedError
 
-        poi_info = self.env(
-            "{func}('{city}', 'name', lambda x: True)".format(func=func_name, city=city)
-        )["data"]
-        # print(poi_info)
-        while True:
-            info_i = self.env("next_page()")["data"]
-            if len(info_i) == 0:
-                break
-            else:
-                poi_info = pd.concat([poi_info, info_i], axis=0, ignore_index=True)
+        poi_info = self.env.call(func_name, city).all_pages()
 
         # print(poi_info)
         return poi_info
@@ -13,6 +13,7 @@ from tqdm import tqdm
 from copy import deepcopy
 from chinatravel.agent.llms import Deepseek, GPT4o, Qwen, Mistral, GLM4Plus
 from chinatravel.symbol_verification.concept_func import func_dict
+from chinatravel.symbol_verification.constraints import ConstraintSet
 from chinatravel.agent.nesy_agent.prompts import NL2SL_INSTRUCTION
 from chinatravel.agent.nesy_agent.ast_checker import HardLogicPyChecker
 from chinatravel.data.load_datasets import save_json_file, load_json_file
@@ -316,26 +317,12 @@ def check(query):
         return [], []
     
     example_plan = EXAMPLE_PLANS[query["days"]]
-    for idx, constraint in enumerate(hard_logic_py):
-        vars_dict = deepcopy(func_dict)
-        vars_dict["plan"] = example_plan
-        try:
-            # Evaluate the constraint in a safe manner
-            exec(
-                constraint,
-                {
-                    "__builtins__": {
-                        "set": set,
-                    }
-                },
-                vars_dict,
-            )
-        except Exception as e:
-            if str(e) not in [
-                "Failed to create Point instance from string: unknown format.",
-            ]:
-                run_error_list.append(str(e))
-                run_error_idx.append(idx)
+    for idx, e in ConstraintSet.of(hard_logic_py).errors(example_plan):
+        if str(e) not in [
+            "Failed to create Point instance from string: unknown format.",
+        ]:
+            run_error_list.append(str(e))
+            run_error_idx.append(idx)
     return run_error_list, run_error_idx
 
 
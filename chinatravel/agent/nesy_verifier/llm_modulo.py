@@ -22,6 +22,7 @@ import pandas as pd
 import ast
 
 from chinatravel.agent.utils import Logger
+from chinatravel.environment.timeutil import minutes_between
 
 import numpy as np
 import re
@@ -31,9 +32,7 @@ import time
 from tqdm import tqdm
 
 def calc_time_delta(st_time, ed_time):
-    st_h, st_m = int(st_time.split(":")[0]), int(st_time.split(":")[1])
-    ed_h, ed_m = int(ed_time.split(":")[0]), int(ed_time.split(":")[1])
-    return (ed_m - st_m) + (ed_h - st_h) * 60
+    return minutes_between(st_time, ed_time)
 
 class LLMModuloAgent(BaseAgent):
     def __init__(self, **kwargs):
@@ -61,53 +60,24 @@ class LLMModuloAgent(BaseAgent):
         else:
             raise NotImplementedError
 
-        poi_info = self.env(
-            "{func}('{city}', 'name', lambda x: True)".format(func=func_name, city=city)
-        )["data"]
-        # print(poi_info)
-        while True:
-            info_i = self.env("next_page()")["data"]
-            if len(info_i) == 0:
-                break
-            else:
-                poi_info = pd.concat([poi_info, info_i], axis=0, ignore_index=True)
+        poi_info = self.env.call(func_name, city).all_pages()
 
         poi_info = poi_info.rename(columns={'cost': 'price'})
         return poi_info
 
     def collect_intercity_transport(self, source_city, target_city, trans_type):
-        trans_info = self.env(
-            "intercity_transport_select('{source_city}', '{target_city}', '{trans_type}')".format(
-                source_city=source_city, target_city=target_city, trans_type=trans_type
-            )
-        )["data"]
-        # print(poi_info)
-        while True:
-            info_i = self.env("next_page()")["data"]
-            if len(info_i) == 0:
-                break
-            else:
-                trans_info = pd.concat([trans_info, info_i], axis=0, ignore_index=True)
+        trans_info = self.env.call(
+            "intercity_transport_select", source_city, target_city, trans_type
+        ).all_pages()
         # print(poi_info)
         trans_info = trans_info.rename(columns={'Cost': 'price'})
         return trans_info
     
     def collect_innercity_transport(self, city, start, end, start_time, trans_type):
 
-        call_str = (
-            'goto("{city}", "{start}", "{end}", "{start_time}", "{trans_type}")'.format(
-                city=city,
-                start=start,
-                end=end,
-                start_time=start_time,
-                trans_type=trans_type,
-            )
-        )
-
-        # print(call_str)
         if start == end:
             return []
-        info = self.env(call_str)["data"]
+        info = self.env.call("goto", city, start, end, start_time, trans_type)["data"]
 
         # print(start, end, info)
 
@@ -7,6 +7,7 @@ from chinatravel.environment.tools.restaurants.apis import Restaurants
 from chinatravel.environment.tools.attractions.apis import Attractions
 from chinatravel.environment.tools.intercity_transport.apis import IntercityTransport
 from chinatravel.environment.tools.transportation.apis import Transportation
+from chinatravel.environment.timeutil import to_minutes
 # from env.tools.transportation.apis import GoTo
 # from envs import goto
 import json
@@ -315,7 +316,7 @@ def collect_attractions_error(symbolic_input, plan_json, verbose=False):
                 error_info.append(f"No position information in attraction activity, day {day_i+1}.")
                 continue
             
-            select_attraction=attractions.select(target_city,key='name',func=lambda x:x==activity_i['position'])
+            select_attraction=attractions.get_by_name(target_city,activity_i['position'])
 
             if select_attraction.empty:
                 error_info.append(f"Attraction activity, {activity_i['position']}, in day {day_i+1} is not valid in the provided information.")
@@ -406,7 +407,7 @@ def collect_hotels_error(symbolic_input, plan_json, verbose=False):
                 error_info.append(f"No position information in accommodation activity, day {day_i+1}.")
                 continue
             
-            select_hotel=accommodation.select(target_city,key='name',func=lambda x:x==activity_i['position'])
+            select_hotel=accommodation.get_by_name(target_city,activity_i['position'])
 
             if select_hotel.empty:
                 error_info.append(f"Accommodation activity, {activity_i['position']}, in day {day_i+1} is not valid in the provided information.")
@@ -493,13 +494,13 @@ def collect_restaurants_error(symbolic_input, plan_json, verbose=False):
                 continue
             
 
-            select_restaurant=restaurants.select(target_city,key='name',func=lambda x:x==activity_i['position'])
+            select_restaurant=restaurants.get_by_name(target_city,activity_i['position'])
 
             # print(select_restaurant)
 
             if activity_i["type"] == "breakfast" and select_restaurant.empty:
 
-                select_hotel=accommodation.select(target_city,key='name',func=lambda x:x==activity_i['position'])
+                select_hotel=accommodation.get_by_name(target_city,activity_i['position'])
     
                 if select_hotel.empty:
                     error_info.append(f"Breakfast activity, {activity_i['position']}, in day {day_i+1} is not valid in the provided information.")
@@ -697,15 +698,11 @@ def collect_transport_error(symbolic_input, plan_json, verbose=False):
 
 def time_compare_if_earlier_equal(time_1, time_2):
 
-    time1 = float(time_1.split(":")[0])*60 + float(time_1.split(":")[1])
-    time2 = float(time_2.split(":")[0])*60 + float(time_2.split(":")[1])
-    
-    
-    return time1 <= time2
+    return to_minutes(time_1) <= to_minutes(time_2)
 
 def time2real(time_str):
     time_str = time_str.split("次日")[-1]
-    return float(time_str.split(":")[0])*60 + float(time_str.split(":")[1])
+    return to_minutes(time_str)
 
 def collect_time_error(symbolic_input, plan_json, verbose=False): 
     
@@ -8,6 +8,7 @@ from chinatravel.environment.tools.intercity_transport.apis import IntercityTran
 from chinatravel.environment.tools.transportation.apis import Transportation
 
 from chinatravel.symbol_verification.concept_func import func_dict
+from chinatravel.symbol_verification.constraints import ConstraintSet
 from chinatravel.evaluation.utils import load_json_file
 
 import pandas as pd
@@ -28,23 +29,10 @@ def collect_personal_error(problem, plan, verbose=False):
         return []
 
     error_info = []
+    constraints = ConstraintSet.of(problem["hard_logic_py"])
     for idx, constraint in enumerate(problem["hard_logic_py"]):
-        vars_dict = deepcopy(func_dict)
-        vars_dict["plan"] = plan
-        # exec(constraint, {"__builtins__": {"set": set, "print": print}}, vars_dict)
-        # results.append(vars_dict.get("result", False))
         try:
-            # Evaluate the constraint in a safe manner
-            exec(
-                constraint,
-                {
-                    "__builtins__": {
-                        "set": set,
-                    }
-                },
-                vars_dict,
-            )
-            res_i = vars_dict.get("result", False)
+            res_i = constraints.run(idx, plan).get("result", False)
             # results.append(bool(res_i))
             if not res_i:
                 error_info.append(f"用户要求未被满足：{problem['hard_logic_nl'][idx]}")
@@ -0,0 +1,119 @@
+import asyncio
+import copy
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from chinatravel.environment.world_env import ResultHistory, WorldEnv, _compile
+
+
+class AsyncWorldEnv:
+    """
+    The WorldEnv tools as coroutines, for agents that await LLM requests.
+
+        env = AsyncWorldEnv()
+        out = await env("goto('上海', '上海景点1', '上海景点2', '08:00', 'metro')")
+        out = await env.call("attractions_nearby", "上海", "上海景点1", 10, 2)
+        out = await env.attractions_select("上海", "price", le(50))
+
+    Calls of the tools in OFFLOAD run in a thread pool, so they overlap with
+    other coroutines (and numpy/pandas release the GIL for much of the work);
+    the cheap ones run directly on the event loop. All episodes of a
+    process can share one instance: `episode()` gives a handle with its own
+    `Results` and `next_page()` over the same environment, caches and pool.
+    """
+
+    OFFLOAD = frozenset(
+        {
+            "goto",
+            "attractions_nearby",
+            "accommodations_nearby",
+            "restaurants_nearby",
+            "attractions_select",
+            "accommodations_select",
+            "restaurants_select",
+            "restaurants_with_recommended_food",
+            "attractions_ids_are_open",
+            "restaurants_ids_are_open",
+            "intercity_transport_select",
+        }
+    )
+
+    def __init__(self, env: WorldEnv = None, max_workers=None, executor=None):
+        self.env = env if env is not None else WorldEnv()
+        self._own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="world-env"
+        )
+        self.results = ResultHistory(self.env.results.maxlen)
+
+    def episode(self):
+        """A handle on the same environment and pool with its own results."""
+        other = copy.copy(self)
+        other._own_executor = False
+        other.results = ResultHistory(self.results.maxlen)
+        return other
+
+    async def _run(self, name, func, *args):
+        if name in self.OFFLOAD:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, partial(func, *args))
+        return func(*args)
+
+    async def __call__(self, cmd_str: str):
+        # a command that doesn't parse runs on the loop, and `_execute` turns
+        # its error into the "Invalid command" output as WorldEnv does
+        try:
+            name = _compile(cmd_str)[1]
+        except Exception:
+            name = None
+        return await self._run(name, self.env._execute, cmd_str, self.results)
+
+    async def call(self, name: str, *args, **kwargs):
+        return await self._run(
+            name, self.env._dispatch, name, args, kwargs, self.results
+        )
+
+    def __getattr__(self, name):
+        if name.startswith("_") or name not in self.env.tools:
+            raise AttributeError(name)
+        return partial(self.call, name)
+
+    def reset(self):
+        self.results.clear()
+
+    def close(self):
+        if self._own_executor:
+            self.executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    import time
+
+    async def episode(env, city, delay):
+        await asyncio.sleep(delay)  # stands in for an LLM request
+        out = await env("attractions_select('{}')".format(city))
+        names = out["whole_data"]["name"].tolist()[:3]
+        legs = await env.call("goto", city, names[0], names[1], "08:00", "metro")
+        await asyncio.sleep(delay)
+        nearby = await env.attractions_nearby(city, names[2], 5, 3)
+        page = await env("next_page()")
+        return len(env.results), legs["success"], nearby["success"], page["success"]
+
+    async def main():
+        cities = ["上海", "北京", "深圳", "广州"]
+        async with AsyncWorldEnv() as env:
+            start = time.time()
+            res = await asyncio.gather(
+                *[episode(env.episode(), city, 0.2) for city in cities]
+            )
+            print(res, "{:.2f}s".format(time.time() - start))
+            assert all(r == (4, True, True, True) for r in res)
+            assert len(env.results) == 0
+
+    asyncio.run(main())
@@ -0,0 +1,161 @@
+import copy
+import time
+import threading
+import types
+from collections import OrderedDict
+
+from pandas import DataFrame
+
+from chinatravel.environment.predicates import Predicate
+from chinatravel.environment.sandbox_db import is_read_only, read_only
+
+
+class Uncacheable(Exception):
+    pass
+
+
+def normalize(value):
+    """
+    Hashable key for an argument of a tool call. Lambdas are keyed by their
+    code and the values they close over or read from globals, predicates by
+    their description.
+    Raises Uncacheable for anything else that is not a plain value.
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (tuple, list)):
+        return (type(value).__name__,) + tuple(normalize(v) for v in value)
+    if isinstance(value, dict):
+        return ("dict",) + tuple(
+            sorted((normalize(k), normalize(v)) for k, v in value.items())
+        )
+    if isinstance(value, Predicate):
+        desc = repr(value)
+        if "where(...)" in desc:
+            raise Uncacheable(desc)
+        return ("predicate", desc)
+    if isinstance(value, types.FunctionType):
+        code = value.__code__
+        return (
+            "function",
+            code.co_code,
+            normalize(code.co_consts),
+            code.co_names,
+            tuple(normalize(cell.cell_contents) for cell in value.__closure__ or ()),
+            tuple(
+                (name, normalize(value.__globals__[name]))
+                for name in code.co_names
+                if name in value.__globals__
+            ),
+            normalize(value.__defaults__),
+        )
+    raise Uncacheable(type(value).__name__)
+
+
+def call_key(name, args=(), kwargs=None):
+    """Key of `name(*args, **kwargs)`, None if it can't be cached."""
+    try:
+        return (name, normalize(tuple(args)), normalize(kwargs or {}))
+    except (Uncacheable, TypeError, ValueError):
+        return None
+
+
+def detach(value):
+    """
+    A copy of a tool result that shares no writable data with `value`, so
+    either can be changed without touching the other. DataFrames are copied
+    deeply, except read-only views, which are viewed again.
+    """
+    if isinstance(value, DataFrame):
+        # a read-only view of the shared tables, such as `select(city)` returns
+        return read_only(value) if is_read_only(value) else value.copy()
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return copy.deepcopy(value)
+
+
+class CallCache:
+    """
+    LRU cache of tool results for WorldEnv, bounded by `maxsize` entries and,
+    if `ttl` is set, by age in seconds. Values go in and come out through
+    `detach`, so results handed to callers never alias the cached ones.
+    Safe to share between threads.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """(True, value) for a hit, (False, None) for a miss."""
+        hit, value = self._lookup(key)
+        return hit, detach(value) if hit else None
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, stamp = entry
+                if self.ttl is None or time.monotonic() - stamp <= self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    # cached values are never changed, copy outside the lock
+                    return True, value
+                del self._data[key]
+                self.expired += 1
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        value = detach(value)
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "expired": self.expired,
+        }
+
+
+if __name__ == "__main__":
+    cache = CallCache(maxsize=2)
+    result = DataFrame({"name": ["a", "b"], "price": [10, 20]})
+    cache.put("filtered", result)
+    result.loc[0, "price"] = 0
+    _, value = cache.get("filtered")
+    value.loc[1, "name"] = "c"
+    _, value = cache.get("filtered")
+    assert value["price"].tolist() == [10, 20] and value["name"].tolist() == ["a", "b"]
+
+    cache.put("all", read_only(result))
+    _, value = cache.get("all")
+    try:
+        value.loc[0, "price"] = 5
+        raise AssertionError("cached view is writable")
+    except ValueError:
+        pass
+    assert result["price"].tolist() == [0, 20]
+    print("CallCache OK")
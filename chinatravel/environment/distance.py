@@ -0,0 +1,189 @@
+import math
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+# WGS-84, the ellipsoid geopy's `geodesic` uses by default
+WGS84_A = 6378.137
+WGS84_F = 1 / 298.257223563
+WGS84_B = (1 - WGS84_F) * WGS84_A
+
+MODES = ("exact", "geodesic", "haversine")
+
+_MAX_ITER = 200
+_TOL = 1e-12
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Central angle in radians between points given in degrees."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * np.arcsin(np.sqrt(a))
+
+
+def _vincenty_terms(sin_sigma, cos_sigma, cos2_alpha, cos_2sm):
+    u2 = cos2_alpha * (WGS84_A**2 - WGS84_B**2) / WGS84_B**2
+    a = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+    b = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+    delta_sigma = (
+        b
+        * sin_sigma
+        * (
+            cos_2sm
+            + b
+            / 4
+            * (
+                cos_sigma * (-1 + 2 * cos_2sm**2)
+                - b / 6 * cos_2sm * (-3 + 4 * sin_sigma**2) * (-3 + 4 * cos_2sm**2)
+            )
+        )
+    )
+    return a, delta_sigma
+
+
+def vincenty(lat1, lon1, lat2, lon2):
+    """
+    Ellipsoidal distance in km between arrays of points given in degrees,
+    by Vincenty's inverse formula on WGS-84. Pairs where the iteration does
+    not converge (nearly antipodal points) are handed to geopy.
+    """
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(
+        *[np.asarray(x, dtype=float) for x in (lat1, lon1, lat2, lon2)]
+    )
+    u1 = np.arctan((1 - WGS84_F) * np.tan(np.radians(lat1)))
+    u2 = np.arctan((1 - WGS84_F) * np.tan(np.radians(lat2)))
+    sin_u1, cos_u1 = np.sin(u1), np.cos(u1)
+    sin_u2, cos_u2 = np.sin(u2), np.cos(u2)
+    big_l = np.radians(lon2 - lon1)
+    lam = big_l
+    converged = np.zeros(lat1.shape, dtype=bool)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for _ in range(_MAX_ITER):
+            sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+            sin_sigma = np.hypot(
+                cos_u2 * sin_lam, cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam
+            )
+            cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lam
+            sigma = np.arctan2(sin_sigma, cos_sigma)
+            sin_alpha = np.where(
+                sin_sigma == 0, 0.0, cos_u1 * cos_u2 * sin_lam / sin_sigma
+            )
+            cos2_alpha = 1 - sin_alpha**2
+            cos_2sm = np.where(
+                cos2_alpha == 0, 0.0, cos_sigma - 2 * sin_u1 * sin_u2 / cos2_alpha
+            )
+            c = WGS84_F / 16 * cos2_alpha * (4 + WGS84_F * (4 - 3 * cos2_alpha))
+            lam_prev = lam
+            lam = big_l + (1 - c) * WGS84_F * sin_alpha * (
+                sigma
+                + c * sin_sigma * (cos_2sm + c * cos_sigma * (-1 + 2 * cos_2sm**2))
+            )
+            converged = np.abs(lam - lam_prev) < _TOL
+            if converged.all():
+                break
+    a, delta_sigma = _vincenty_terms(sin_sigma, cos_sigma, cos2_alpha, cos_2sm)
+    dist = np.where(sin_sigma == 0, 0.0, WGS84_B * a * (sigma - delta_sigma))
+    if not converged.all():
+        from geopy.distance import geodesic
+
+        for i in zip(*np.nonzero(~converged)):
+            dist[i] = geodesic((lat1[i], lon1[i]), (lat2[i], lon2[i])).km
+    return dist
+
+
+def vincenty_pair(lat1, lon1, lat2, lon2):
+    """`vincenty` for a single pair, without the numpy per-call overhead."""
+    u1 = math.atan((1 - WGS84_F) * math.tan(math.radians(lat1)))
+    u2 = math.atan((1 - WGS84_F) * math.tan(math.radians(lat2)))
+    sin_u1, cos_u1 = math.sin(u1), math.cos(u1)
+    sin_u2, cos_u2 = math.sin(u2), math.cos(u2)
+    big_l = math.radians(lon2 - lon1)
+    lam = big_l
+    for _ in range(_MAX_ITER):
+        sin_lam, cos_lam = math.sin(lam), math.cos(lam)
+        sin_sigma = math.hypot(
+            cos_u2 * sin_lam, cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam
+        )
+        if sin_sigma == 0:
+            return 0.0
+        cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lam
+        sigma = math.atan2(sin_sigma, cos_sigma)
+        sin_alpha = cos_u1 * cos_u2 * sin_lam / sin_sigma
+        cos2_alpha = 1 - sin_alpha**2
+        cos_2sm = cos_sigma - 2 * sin_u1 * sin_u2 / cos2_alpha if cos2_alpha else 0.0
+        c = WGS84_F / 16 * cos2_alpha * (4 + WGS84_F * (4 - 3 * cos2_alpha))
+        lam_prev = lam
+        lam = big_l + (1 - c) * WGS84_F * sin_alpha * (
+            sigma + c * sin_sigma * (cos_2sm + c * cos_sigma * (-1 + 2 * cos_2sm**2))
+        )
+        if abs(lam - lam_prev) < _TOL:
+            break
+    else:
+        from geopy.distance import geodesic
+
+        return geodesic((lat1, lon1), (lat2, lon2)).km
+    a, delta_sigma = _vincenty_terms(sin_sigma, cos_sigma, cos2_alpha, cos_2sm)
+    return WGS84_B * a * (sigma - delta_sigma)
+
+
+def distance(a, b, mode="geodesic"):
+    """
+    Distance in km between two (lat, lon) points. `mode="geodesic"` agrees
+    with geopy's `geodesic(a, b).km` to well under a millimetre;
+    `mode="haversine"` is the faster spherical approximation (within 0.6%).
+    `mode="exact"` is geopy's value itself, for distances that are reported
+    unrounded. Points geopy can't read raise geopy's error in every mode.
+    """
+    try:
+        lat1, lon1, lat2, lon2 = float(a[0]), float(a[1]), float(b[0]), float(b[1])
+    except (TypeError, ValueError, IndexError):
+        mode = "exact"
+    if mode == "exact":
+        from geopy.distance import geodesic
+
+        return geodesic(a, b).km
+    if mode == "geodesic":
+        return vincenty_pair(lat1, lon1, lat2, lon2)
+    if mode == "haversine":
+        return EARTH_RADIUS_KM * float(haversine(lat1, lon1, lat2, lon2))
+    raise ValueError("mode should be one of {}".format(MODES))
+
+
+def _latlon(points):
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    return points[:, 0], points[:, 1]
+
+
+def one_to_many(a, points, mode="geodesic"):
+    """Distances in km from the point `a` to each (lat, lon) of `points`."""
+    lat, lon = _latlon(points)
+    try:
+        float(a[0]), float(a[1])
+    except (TypeError, ValueError, IndexError):
+        mode = "exact"
+    if mode == "exact":
+        from geopy.distance import geodesic
+
+        return np.array([geodesic(a, p).km for p in zip(lat, lon)], dtype=float)
+    if mode == "geodesic":
+        return vincenty(a[0], a[1], lat, lon)
+    if mode == "haversine":
+        return EARTH_RADIUS_KM * haversine(a[0], a[1], lat, lon)
+    raise ValueError("mode should be one of {}".format(MODES))
+
+
+def many_to_many(points_a, points_b, mode="geodesic"):
+    """Matrix of distances in km, `points_a` along rows, `points_b` along columns."""
+    lat1, lon1 = _latlon(points_a)
+    lat2, lon2 = _latlon(points_b)
+    lat1, lon1 = lat1[:, None], lon1[:, None]
+    if mode == "geodesic":
+        return vincenty(lat1, lon1, lat2, lon2)
+    if mode == "haversine":
+        return EARTH_RADIUS_KM * haversine(lat1, lon1, lat2, lon2)
+    raise ValueError("mode should be one of {}".format(MODES))
+
@@ -0,0 +1,97 @@
+import numpy as np
+from pandas import DataFrame
+
+
+def positions(rows) -> np.ndarray:
+    """
+    `rows` as an int64 array of row positions, read-only: the postings of an
+    index are returned to callers as they are, so a caller writing to one
+    would change the index for every later query.
+    """
+    array = np.array(rows, dtype=np.int64)
+    array.flags.writeable = False
+    return array
+
+
+_EMPTY = positions([])
+
+
+def build_name_index(data: DataFrame, key: str = "name") -> dict:
+    """
+    Map every value of `data[key]` to the positions of the rows holding it.
+    NaN values are left out, as they never compare equal to a name.
+    """
+    index = {}
+    for i, name in enumerate(data[key].values):
+        if name == name:
+            index.setdefault(name, []).append(i)
+    return index
+
+
+def lookup(data: DataFrame, index: dict, name) -> DataFrame:
+    try:
+        positions = index.get(name, [])
+    except TypeError:
+        positions = []
+    return data.iloc[positions]
+
+
+def build_token_index(data: DataFrame, key: str, sep: str = ",") -> dict:
+    """
+    Map every `sep`-separated token of `data[key]` (e.g. one dish of
+    `recommendedfood`) to the sorted positions of the rows holding it.
+    """
+    index = {}
+    for i, text in enumerate(data[key].values):
+        if isinstance(text, str):
+            for token in set(text.split(sep)):
+                index.setdefault(token.strip(), []).append(i)
+    return {token: positions(rows) for token, rows in index.items()}
+
+
+class NgramIndex:
+    """
+    Substring index over a string column: for each character and each pair
+    of consecutive characters, the sorted positions of the rows holding it.
+    `search(sub)` intersects the postings of the pairs in `sub` and checks
+    the remaining rows with `in`, the same match as
+    `str.contains(sub, regex=False)` (rows without a string never match).
+    """
+
+    def __init__(self, values):
+        # the column's own array, not a list of its strings: attached from
+        # shared memory, its strings are only built when a row is checked
+        self.values = values
+        postings = {}
+        valid = []
+        for i, text in enumerate(self.values):
+            if not isinstance(text, str):
+                continue
+            valid.append(i)
+            grams = set(text)
+            grams.update(text[j : j + 2] for j in range(len(text) - 1))
+            for gram in grams:
+                postings.setdefault(gram, []).append(i)
+        self.valid = positions(valid)
+        self.postings = {gram: positions(rows) for gram, rows in postings.items()}
+
+    @classmethod
+    def from_table(cls, data: DataFrame, key: str):
+        return cls(data[key].values)
+
+    def search(self, sub: str) -> np.ndarray:
+        """Sorted positions of the rows containing `sub`."""
+        if len(sub) == 0:
+            return self.valid
+        if len(sub) == 1:
+            return self.postings.get(sub, _EMPTY)
+        grams = {sub[j : j + 2] for j in range(len(sub) - 1)}
+        lists = sorted((self.postings.get(gram, _EMPTY) for gram in grams), key=len)
+        res = lists[0]
+        for rows in lists[1:]:
+            if len(res) == 0:
+                break
+            res = np.intersect1d(res, rows, assume_unique=True)
+        if len(sub) > 2 and len(res):
+            res = res[[sub in self.values[i] for i in res]]
+        return res
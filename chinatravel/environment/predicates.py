@@ -0,0 +1,197 @@
+import numpy as np
+from pandas import DataFrame
+
+from chinatravel.environment.sandbox_db import read_only
+from chinatravel.environment.timeutil import open_mask, opening_column, to_minutes
+
+
+class Predicate:
+    """
+    Vectorized row filter for the `*_select` APIs.
+
+    A predicate is built for one column (`eq(...)`, `le(...)`, ...) and
+    evaluated on the whole column at once. The column is either given
+    explicitly (`le(100, key="price")`) or taken from the `key` argument of
+    `select`. Predicates compose with `&`, `|` and `~`, also across columns.
+    """
+
+    def __init__(self, func, key=None, desc=""):
+        self._func = func
+        self.key = key
+        self.desc = desc
+
+    def keys(self, default=None):
+        return [self.key or default]
+
+    def mask(self, data: DataFrame, key=None) -> np.ndarray:
+        return np.asarray(self._func(data[self.key or key]), dtype=bool)
+
+    def __and__(self, other):
+        return _Compound(np.logical_and, [self, other], "&")
+
+    def __or__(self, other):
+        return _Compound(np.logical_or, [self, other], "|")
+
+    def __invert__(self):
+        return _Compound(np.logical_not, [self], "~")
+
+    def __repr__(self):
+        if self.key is None:
+            return self.desc
+        return "{}[{}]".format(self.desc, self.key)
+
+
+class _Compound(Predicate):
+    def __init__(self, op, children, desc):
+        super().__init__(None, desc=desc)
+        self._op = op
+        self._children = children
+
+    def keys(self, default=None):
+        return [key for child in self._children for key in child.keys(default)]
+
+    def mask(self, data: DataFrame, key=None) -> np.ndarray:
+        return self._op(*[child.mask(data, key) for child in self._children])
+
+    def __repr__(self):
+        if len(self._children) == 1:
+            return "~({})".format(self._children[0])
+        return "({} {} {})".format(self._children[0], self.desc, self._children[1])
+
+
+def eq(value, key=None):
+    return Predicate(lambda col: col == value, key, "eq({!r})".format(value))
+
+
+def ne(value, key=None):
+    return Predicate(lambda col: col != value, key, "ne({!r})".format(value))
+
+
+def lt(value, key=None):
+    return Predicate(lambda col: col < value, key, "lt({!r})".format(value))
+
+
+def le(value, key=None):
+    return Predicate(lambda col: col <= value, key, "le({!r})".format(value))
+
+
+def gt(value, key=None):
+    return Predicate(lambda col: col > value, key, "gt({!r})".format(value))
+
+
+def ge(value, key=None):
+    return Predicate(lambda col: col >= value, key, "ge({!r})".format(value))
+
+
+def between(low, high, key=None):
+    return Predicate(
+        lambda col: (col >= low) & (col <= high),
+        key,
+        "between({!r}, {!r})".format(low, high),
+    )
+
+
+def isin(values, key=None):
+    values = list(values)
+    return Predicate(lambda col: col.isin(values), key, "isin({!r})".format(values))
+
+
+def contains(sub, key=None):
+    return Predicate(
+        lambda col: col.str.contains(sub, regex=False, na=False),
+        key,
+        "contains({!r})".format(sub),
+    )
+
+
+def where(func, key=None):
+    """Per-row lambda, for mixing old-style filters into a predicate."""
+    return Predicate(lambda col: [func(x) for x in col], key, "where(...)")
+
+
+class _Bound(Predicate):
+    def __init__(self, predicate, key):
+        super().__init__(None, key, repr(predicate))
+        self._predicate = predicate
+
+    def keys(self, default=None):
+        return self._predicate.keys(self.key)
+
+    def mask(self, data: DataFrame, key=None) -> np.ndarray:
+        return self._predicate.mask(data, self.key)
+
+
+class _OpenAt(Predicate):
+    def __init__(self, time):
+        super().__init__(None, desc="open_at({!r})".format(time))
+        self.time = to_minutes(time)
+
+    def keys(self, default=None):
+        return ["opentime", "endtime"]
+
+    def mask(self, data: DataFrame, key=None) -> np.ndarray:
+        return open_mask(
+            opening_column(data["opentime"]), opening_column(data["endtime"]), self.time
+        )
+
+
+def open_at(time: str):
+    """
+    Rows open at `time` ('HH:MM'), following `id_is_open`: an end time
+    earlier than the open time means open over midnight, and a row that
+    is not open that day ('不营业') never matches.
+    """
+    return _OpenAt(time)
+
+
+PREDICATES = {
+    "eq": eq,
+    "ne": ne,
+    "lt": lt,
+    "le": le,
+    "gt": gt,
+    "ge": ge,
+    "between": between,
+    "isin": isin,
+    "contains": contains,
+    "open_at": open_at,
+    "where": where,
+}
+
+
+def select_rows(data: DataFrame, key=None, func=None):
+    """
+    Shared implementation of `Attractions/Accommodations/Restaurants.select`.
+
+    select(city, key, lambda x: ...)   per-row lambda on one column
+    select(city, key, predicate)       vectorized predicate on `key`
+    select(city, predicate)            predicate with its own column(s)
+    select(city, {key: predicate, ...}) all predicates must hold
+    select(city)                       all rows, a read-only view of the data
+    """
+    if isinstance(key, dict):
+        predicate = None
+        for k, v in key.items():
+            if callable(v) and not isinstance(v, Predicate):
+                v = where(v)
+            elif not isinstance(v, Predicate):
+                v = eq(v)
+            p = _Bound(v, k)
+            predicate = p if predicate is None else predicate & p
+        key, func = None, predicate
+    elif isinstance(key, Predicate):
+        key, func = None, key
+    if func is None:
+        if key is not None and key not in data.keys():
+            return "Key not found."
+        return read_only(data)
+    if not isinstance(func, Predicate):
+        if key not in data.keys():
+            return "Key not found."
+        bool_list = [func(x) for x in data[key]]
+        return data[bool_list]
+    for k in func.keys(key):
+        if k not in data.keys():
+            return "Key not found."
+    return data[func.mask(data, key)]
+
@@ -0,0 +1,381 @@
+import os
+import sys
+import json
+import time
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from chinatravel.environment.snapshot import Snapshot
+
+
+def read_csv(path):
+    return pd.read_csv(path)
+
+
+def read_csv_dropna(path):
+    return pd.read_csv(path).dropna()
+
+
+def read_json_table(path):
+    return pd.read_json(path)
+
+
+def read_jsonl_table(path):
+    return pd.read_json(path, lines=True, keep_default_dates=False)
+
+
+def read_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_poi(path):
+    city_data = {}
+    for name_pos in read_json(path):
+        city_data[name_pos["name"]] = tuple(name_pos["position"])
+    return city_data
+
+
+def read_only(table):
+    """
+    `table` over the same arrays made non-writeable, without copying them:
+    writing a cell through it raises "assignment destination is read-only".
+    Arrow string columns (attached from shared memory) can't be flagged, but
+    their buffers are immutable: each view gets its own array over them, so
+    a write replaces that array only. Other columns, and values that are not
+    DataFrames, are left as they are.
+    """
+    if not isinstance(table, DataFrame):
+        return table
+    data = {}
+    for i in range(table.shape[1]):
+        column = table.iloc[:, i]
+        values = column.values
+        if isinstance(values, np.ndarray):
+            values = values.view()
+            values.flags.writeable = False
+            data[i] = values
+        elif str(getattr(column.dtype, "storage", "")).startswith("pyarrow"):
+            data[i] = column.array.copy()
+        else:
+            data[i] = column.array
+    frame = DataFrame(data, index=table.index, copy=False)
+    frame.columns = table.columns
+    return frame
+
+
+def is_read_only(table):
+    """
+    Whether every column of the DataFrame `table` is read-only, as in a view
+    made by `read_only`: numpy arrays that are not writeable, or Arrow
+    string arrays, whose buffers are immutable.
+    """
+    for i in range(table.shape[1]):
+        column = table.iloc[:, i]
+        values = column.values
+        if isinstance(values, np.ndarray):
+            if values.flags.writeable:
+                return False
+        elif not str(getattr(column.dtype, "storage", "")).startswith("pyarrow"):
+            return False
+    return True
+
+
+def sizeof(obj, seen=None):
+    if isinstance(obj, (DataFrame, pd.Series)):
+        return int(obj.memory_usage(deep=True).sum())
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(sizeof(k, seen) + sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(sizeof(x, seen) for x in obj)
+    return size
+
+
+class LazyTables(MutableMapping):
+    """
+    Dict-like view over a fixed set of keys whose values are produced by
+    `loader(key)` on access. Assigned values are kept locally and shadow
+    the loader.
+    """
+
+    def __init__(self, keys, loader):
+        self._keys = dict.fromkeys(keys)
+        self._loader = loader
+        self._local = {}
+
+    def __getitem__(self, key):
+        if key in self._local:
+            return self._local[key]
+        if key not in self._keys:
+            raise KeyError(key)
+        return self._loader(key)
+
+    def __setitem__(self, key, value):
+        self._keys[key] = None
+        self._local[key] = value
+
+    def __delitem__(self, key):
+        del self._keys[key]
+        self._local.pop(key, None)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(list(self._keys))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __repr__(self):
+        return "LazyTables({})".format(list(self._keys))
+
+
+class SandboxDatabase:
+    """
+    Process-wide registry of the sandbox tables.
+
+    Every tool reads its files through `SandboxDatabase.get_instance().load(...)`,
+    so a table is parsed once per process no matter how many tool instances
+    (WorldEnv, verifiers, evaluators) are created. As they all share it, the
+    arrays of a loaded DataFrame are made read-only (see `read_only`), however
+    it was loaded.
+
+    In lazy mode (`configure(lazy=True)` or CHINATRAVEL_LAZY_DB=1) the tools
+    only load a city, or an origin/destination train table, on first access,
+    and at most `capacity` tables are kept, least recently used first out.
+
+    When `database/.snapshot` has been compiled (see snapshot.py), tables are
+    read from it instead of being parsed, unless CHINATRAVEL_DB_SNAPSHOT=0.
+    When a parent process published the tables (see shared_db.py), they are
+    attached from shared memory first.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._keys = {}
+        self._tables = OrderedDict()
+        self._derived = {}
+        self._stats = {}
+        self.lazy = os.environ.get("CHINATRAVEL_LAZY_DB", "0") not in ("", "0")
+        self.use_snapshot = os.environ.get("CHINATRAVEL_DB_SNAPSHOT", "1") not in (
+            "",
+            "0",
+        )
+        self._snapshot = None
+        self._shared = None
+        self.shared_name = os.environ.get("CHINATRAVEL_SHARED_DB") or None
+        self.capacity = None
+        if self.lazy:
+            self.capacity = int(os.environ.get("CHINATRAVEL_DB_CAPACITY", 32))
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def configure(self, lazy: bool = None, capacity: int = None, snapshot: bool = None):
+        with self._lock:
+            if snapshot is not None:
+                self.use_snapshot = snapshot
+            if lazy is not None:
+                self.lazy = lazy
+                if not lazy:
+                    self.capacity = None
+                elif self.capacity is None:
+                    self.capacity = 32
+            if capacity is not None:
+                self.capacity = capacity
+            self._evict()
+        return self
+
+    def _key(self, path, reader):
+        key = self._keys.get((path, reader.__name__))
+        if key is None:
+            key = (os.path.realpath(path), reader.__name__)
+            self._keys[(path, reader.__name__)] = key
+        return key
+
+    def _evict(self):
+        if self.capacity is None:
+            return
+        while len(self._tables) > self.capacity:
+            key, _ = self._tables.popitem(last=False)
+            self._derived.pop(key, None)
+            self._stats.pop(key, None)
+
+    def load(self, path: str, reader=read_csv, name: str = None):
+        key = self._key(path, reader)
+        table = self._tables.get(key)
+        if table is not None:
+            if self.capacity is not None:
+                with self._lock:
+                    if key in self._tables:
+                        self._tables.move_to_end(key)
+            return table
+        with self._lock:
+            if key in self._tables:
+                return self._tables[key]
+            start = time.time()
+            sources = [key[0]]
+            if hasattr(reader, "sources"):
+                sources += [os.path.realpath(p) for p in reader.sources(path)]
+            table, source = None, "parse"
+            if self.shared is not None:
+                table = self.shared.load(key[0], key[1])
+                source = "shared"
+            if table is None and self.use_snapshot:
+                table = self.snapshot.load(key[0], key[1], sources)
+                source = "snapshot"
+            if table is None:
+                table, source = reader(key[0]), "parse"
+            load_time = time.time() - start
+            memory = sizeof(table)
+            table = self._tables[key] = read_only(table)
+            self._stats[key] = {
+                "name": name or os.path.relpath(key[0], self.root),
+                "path": key[0],
+                "sources": sources,
+                "reader": reader.__name__,
+                "source": source,
+                "rows": len(table),
+                "load_time": load_time,
+                "memory": memory,
+            }
+            self._evict()
+            return table
+
+    def derive(self, path: str, reader, name, func):
+        """
+        Value computed once from a loaded table (type lists, graphs, ...),
+        dropped together with the table when it is evicted.
+        """
+        key = self._key(path, reader)
+        derived = self._derived.get(key)
+        if derived is not None and name in derived:
+            return derived[name]
+        table = self.load(path, reader)
+        with self._lock:
+            value = func(table)
+            if key in self._tables:
+                self._derived.setdefault(key, {})[name] = value
+            return value
+
+    def find_derived(self, match):
+        """Derived values of all loaded tables whose name satisfies `match`."""
+        with self._lock:
+            return [
+                value
+                for derived in self._derived.values()
+                for name, value in derived.items()
+                if match(name)
+            ]
+
+    def tables(self, keys, loader):
+        """
+        Per-key tables for a tool: a plain dict filled now, or a LazyTables
+        view calling `loader` on access when the registry is lazy.
+        """
+        if self.lazy:
+            return LazyTables(keys, loader)
+        return {key: loader(key) for key in keys}
+
+    def items(self):
+        with self._lock:
+            return list(self._tables.items())
+
+    def sources(self, key):
+        """Files a loaded table was built from: its path and `reader.sources`."""
+        return self._stats[key]["sources"]
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+            self._derived.clear()
+            self._stats.clear()
+
+    def report(self) -> DataFrame:
+        columns = ["name", "reader", "source", "rows", "load_time", "memory"]
+        return DataFrame(
+            [self._stats[key] for key in self._tables], columns=columns
+        ).reset_index(drop=True)
+
+    @property
+    def shared(self):
+        if self._shared is None and self.shared_name:
+            from chinatravel.environment.shared_db import SharedTables
+
+            try:
+                self._shared = SharedTables(self.shared_name)
+            except FileNotFoundError:
+                self.shared_name = None
+        return self._shared
+
+    @property
+    def snapshot(self) -> Snapshot:
+        if self._snapshot is None:
+            self._snapshot = Snapshot(self.root)
+        return self._snapshot
+
+    @property
+    def root(self):
+        return os.path.realpath(
+            os.path.join(os.path.dirname(__file__), "database")
+        )
+
+
+if __name__ == "__main__":
+    from chinatravel.environment.sandbox_db import SandboxDatabase
+    from chinatravel.environment.tools import Attractions, Restaurants
+
+    start = time.time()
+    Attractions()
+    Restaurants()
+    first = time.time() - start
+    start = time.time()
+    Attractions()
+    Restaurants()
+    second = time.time() - start
+    db = SandboxDatabase.get_instance()
+    report = db.report()
+    print(report)
+    print("first: {:.3f}s, second: {:.3f}s".format(first, second))
+    table = Attractions().data["上海"]
+    for column in table.columns:
+        view = table.copy(deep=False)
+        try:
+            view.loc[view.index[0], column] = view[column].iloc[1]
+            raise AssertionError("shared column {} was written".format(column))
+        except ValueError:
+            pass
+    print("total memory: {:.1f} MB".format(report["memory"].sum() / 2**20))
+
+    # every table, read from the snapshot unless CHINATRAVEL_DB_SNAPSHOT=0
+    from chinatravel.environment.snapshot import load_all_tables
+
+    load_all_tables(snapshot=db.use_snapshot)
+    report = db.report()
+    sources = report["source"].value_counts()
+    print(
+        "load time of all tables: {:.3f}s ({})".format(
+            report["load_time"].sum(),
+            ", ".join("{} from {}".format(n, s) for s, n in sources.items()),
+        )
+    )
@@ -0,0 +1,294 @@
+import os
+import sys
+import pickle
+import secrets
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from chinatravel.environment.sandbox_db import SandboxDatabase
+from chinatravel.environment.snapshot import _is_columnar, load_all_tables
+
+ENV_VAR = "CHINATRAVEL_SHARED_DB"
+_ALIGN = 64
+# segments attached by this process, by name: they stay open for as long as
+# the process lives, since attached tables point into them
+_attached = {}
+
+
+def _attach(name):
+    # an attached segment belongs to the publisher and must not be tracked,
+    # or the resource tracker of a worker would unlink it when it exits
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def _arrow():
+    try:
+        import pyarrow
+    except ImportError:
+        return None
+    return pyarrow
+
+
+def _strings(values):
+    """UTF-8 (offsets, data) of a column holding only str, else None."""
+    if not all(isinstance(v, str) for v in values):
+        return None
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def _layout(table):
+    """
+    (arrays to place per column, rest to pickle) of one table. A column is
+    placed as one numeric array, or as the offsets and UTF-8 data of its
+    strings when pyarrow can read them back; other columns are pickled.
+    """
+    if not _is_columnar(table):
+        return [], table
+    strings = _arrow() is not None
+    arrays, objects = [], {}
+    for i, column in enumerate(table.columns):
+        values = table.iloc[:, i].values
+        if values.dtype != object:
+            arrays.append((np.ascontiguousarray(values),))
+            continue
+        encoded = _strings(values) if strings else None
+        if encoded is None:
+            objects[i] = values
+        arrays.append(encoded)
+    index = table.index
+    if not isinstance(index, pd.RangeIndex):
+        index = index.values
+    return arrays, (objects, index)
+
+
+def _shared_strings(rows, offsets, data):
+    """Strings of a column attached from its offsets and UTF-8 data."""
+    pa = _arrow()
+    if pa is None:
+        return np.array(
+            [bytes(data[a:b]).decode("utf-8") for a, b in zip(offsets, offsets[1:])],
+            dtype=object,
+        )
+    array = pa.Array.from_buffers(
+        pa.large_string(), rows, [None, pa.py_buffer(offsets), pa.py_buffer(data)]
+    )
+    # numpy semantics: comparisons give bool arrays and missing values NaN,
+    # as with the object columns parsed from the sources
+    return pd.StringDtype("pyarrow_numpy").__from_arrow__(array)
+
+
+class SharedDatabase:
+    """
+    The sandbox tables published once into shared memory by a parent process.
+
+        with SharedDatabase.publish():
+            # workers started here (or given `name`) read the tables from it
+            ...
+
+    Each table gets one segment. Numeric columns are raw arrays that workers
+    map read-only without copying. String columns are the Arrow layout of
+    their strings, offsets and UTF-8 data, that workers read through pyarrow
+    without copying either. The index, other object columns and the tables
+    that are not DataFrames (the POI dicts and subway lines) are pickled and
+    unpickled per worker. `publish` sets CHINATRAVEL_SHARED_DB so
+    `SandboxDatabase` in child processes attaches to it; the segments are
+    removed by `close()`.
+    """
+
+    def __init__(self):
+        self.name = None
+        self._segments = []
+
+    @classmethod
+    def publish(cls, tables=None):
+        """
+        Publish `tables` ({(path, reader name): table}, by default every table
+        the tools use) and point child processes at them.
+        """
+        self = cls()
+        if tables is None:
+            # loading every table switches the registry to eager mode, which
+            # is restored once the tables are collected
+            db = SandboxDatabase.get_instance()
+            lazy, capacity, snapshot = db.lazy, db.capacity, db.use_snapshot
+            try:
+                tables = dict(load_all_tables(snapshot=True).items())
+            finally:
+                db.configure(lazy=lazy, capacity=capacity, snapshot=snapshot)
+        prefix = "cts_{}".format(secrets.token_hex(4))
+        entries = {}
+        try:
+            for i, (key, table) in enumerate(tables.items()):
+                entries[key] = self._put("{}_{}".format(prefix, i), table)
+            manifest = pickle.dumps(entries, protocol=pickle.HIGHEST_PROTOCOL)
+            segment = self._create("{}_manifest".format(prefix), len(manifest))
+            segment.buf[: len(manifest)] = manifest
+        except BaseException:
+            self.close()
+            raise
+        self.name = segment.name
+        os.environ[ENV_VAR] = self.name
+        return self
+
+    def _create(self, name, size):
+        segment = shared_memory.SharedMemory(
+            name=name, create=True, size=max(size, 1)
+        )
+        self._segments.append(segment)
+        return segment
+
+    def _put(self, name, table):
+        columns, rest = _layout(table)
+        placed, size = [], 0
+        for arrays in columns:
+            if arrays is None:
+                placed.append(None)
+                continue
+            spans = []
+            for values in arrays:
+                size = -(-size // _ALIGN) * _ALIGN
+                spans.append((size, values.dtype.str, values.shape))
+                size += values.nbytes
+            placed.append(spans)
+        # the layout goes into the table's own segment, so a worker only
+        # unpickles it while attaching the table
+        layout = {
+            "columnar": _is_columnar(table),
+            "columns": list(table.columns) if _is_columnar(table) else None,
+            "arrays": placed,
+            "rows": len(table),
+        }
+        rest = pickle.dumps((layout, rest), protocol=pickle.HIGHEST_PROTOCOL)
+        segment = self._create(name, size + len(rest))
+        for arrays, spans in zip(columns, placed):
+            for values, (offset, _, _) in zip(arrays or (), spans or ()):
+                out = np.ndarray(
+                    values.shape, values.dtype, buffer=segment.buf, offset=offset
+                )
+                out[...] = values
+        segment.buf[size : size + len(rest)] = rest
+        return segment.name, size, len(rest)
+
+    def close(self):
+        for segment in self._segments:
+            segment.close()
+            try:
+                segment.unlink()
+            except FileNotFoundError:
+                pass
+        self._segments = []
+        if self.name is not None and os.environ.get(ENV_VAR) == self.name:
+            del os.environ[ENV_VAR]
+        self.name = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _self_check_worker(queue):
+    from chinatravel.environment.world_env import WorldEnv
+    from chinatravel.environment.sandbox_db import SandboxDatabase
+
+    env = WorldEnv()
+    out = env("attractions_select('上海', 'price', le(50))")
+    legs = env("goto('上海', '上海景点1', '上海景点2', '08:00', 'metro')")["data"]
+    report = SandboxDatabase.get_instance().report()
+    queue.put((str(out), legs, sorted(set(report["source"]))))
+
+
+class SharedTables:
+    """Worker side of `SharedDatabase`: tables attached by their key."""
+
+    def __init__(self, name):
+        self.name = name
+        manifest = _attach(name)
+        self.entries = pickle.loads(bytes(manifest.buf))
+        manifest.close()
+
+    def _segment(self, name):
+        segment = _attached.get(name)
+        if segment is None:
+            segment = _attached[name] = _attach(name)
+        return segment
+
+    def load(self, path, reader, sources=None):
+        entry = self.entries.get((path, reader))
+        if entry is None:
+            return None
+        name, start, length = entry
+        segment = self._segment(name)
+        layout, rest = pickle.loads(segment.buf[start : start + length])
+        if not layout["columnar"]:
+            return rest
+        objects, index = rest
+        data = {}
+        for i, column in enumerate(layout["columns"]):
+            spans = layout["arrays"][i]
+            if spans is None:
+                data[column] = objects[i]
+                continue
+            arrays = []
+            for offset, dtype, shape in spans:
+                values = np.ndarray(
+                    shape, np.dtype(dtype), buffer=segment.buf, offset=offset
+                )
+                values.flags.writeable = False
+                arrays.append(values)
+            if len(arrays) == 1:
+                data[column] = arrays[0]
+            else:
+                data[column] = _shared_strings(layout["rows"], *arrays)
+        if not isinstance(index, pd.RangeIndex):
+            index = pd.Index(index)
+        return DataFrame(data, index=index, columns=layout["columns"], copy=False)
+
+
+if __name__ == "__main__":
+    import sys
+    import multiprocessing
+
+    project_root_path = os.path.dirname(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    if project_root_path not in sys.path:
+        sys.path.insert(0, project_root_path)
+
+    from chinatravel.environment.world_env import WorldEnv
+
+    env = WorldEnv()
+    expected = (
+        str(env("attractions_select('上海', 'price', le(50))")),
+        env("goto('上海', '上海景点1', '上海景点2', '08:00', 'metro')")["data"],
+    )
+    ctx = multiprocessing.get_context("spawn")
+    with SharedDatabase.publish() as shared:
+        print("published", len(SharedTables(shared.name).entries), "tables")
+        queue = ctx.Queue()
+        procs = [
+            ctx.Process(target=_self_check_worker, args=(queue,)) for _ in range(4)
+        ]
+        for p in procs:
+            p.start()
+        results = [queue.get() for _ in procs]
+        for p in procs:
+            p.join()
+    for text, legs, sources in results:
+        assert (text, legs) == expected, (text, legs)
+        assert sources == ["shared"], sources
+    print("{} workers read the shared tables".format(len(results)))
@@ -0,0 +1,210 @@
+import os
+import sys
+import json
+import pickle
+import hashlib
+import argparse
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+SNAPSHOT_DIR = ".snapshot"
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 2
+
+
+def _versions():
+    return {
+        "format": FORMAT_VERSION,
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+
+
+def _source_stat(paths, root):
+    stats = {}
+    for path in paths:
+        st = os.stat(path)
+        stats[os.path.relpath(path, root)] = [st.st_size, st.st_mtime_ns]
+    return stats
+
+
+def _entry_dir(rel_path, reader):
+    return hashlib.sha1("{}|{}".format(rel_path, reader).encode("utf-8")).hexdigest()
+
+
+def _is_columnar(table):
+    return isinstance(table, DataFrame) and all(
+        isinstance(dtype, np.dtype) for dtype in table.dtypes
+    )
+
+
+def _write_table(table, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    if not _is_columnar(table):
+        with open(os.path.join(out_dir, "table.pkl"), "wb") as f:
+            pickle.dump(table, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return {"format": "pickle"}
+    columns, pickled = [], []
+    for i, column in enumerate(table.columns):
+        values = table[column].values
+        np.save(
+            os.path.join(out_dir, f"{i}.npy"),
+            values,
+            allow_pickle=values.dtype == object,
+        )
+        columns.append(column)
+        pickled.append(bool(values.dtype == object))
+    index = table.index
+    if isinstance(index, pd.RangeIndex):
+        index_meta = {"start": index.start, "stop": index.stop, "step": index.step}
+    else:
+        np.save(os.path.join(out_dir, "index.npy"), index.values, allow_pickle=True)
+        index_meta = None
+    return {
+        "format": "npy",
+        "columns": columns,
+        "pickled": pickled,
+        "index": index_meta,
+    }
+
+
+def _read_table(entry, in_dir):
+    if entry["format"] == "pickle":
+        with open(os.path.join(in_dir, "table.pkl"), "rb") as f:
+            return pickle.load(f)
+    data = {}
+    for i, column in enumerate(entry["columns"]):
+        path = os.path.join(in_dir, f"{i}.npy")
+        if entry["pickled"][i]:
+            data[column] = np.load(path, allow_pickle=True)
+        else:
+            data[column] = np.load(path, mmap_mode="r")
+    if entry["index"] is None:
+        index = pd.Index(np.load(os.path.join(in_dir, "index.npy"), allow_pickle=True))
+    else:
+        index = pd.RangeIndex(**entry["index"])
+    return DataFrame(data, index=index, columns=entry["columns"], copy=False)
+
+
+class Snapshot:
+    """
+    Columnar snapshot of the sandbox database, written by `compile_database`.
+
+    Numeric columns are stored as raw `.npy` files and memory-mapped on load,
+    so processes on one machine share their pages through the OS cache.
+    Object (string) columns are stored pickled and unpickled per process:
+    pandas needs them as Python strings, so a memory-mapped encoding would
+    still be decoded per process, and they take a small part of the load.
+    An entry is only used while its source files keep the size and mtime
+    they had when the snapshot was compiled.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.realpath(root)
+        self.path = os.path.join(self.root, SNAPSHOT_DIR)
+        self._manifest = None
+
+    @property
+    def manifest(self):
+        if self._manifest is None:
+            manifest_path = os.path.join(self.path, MANIFEST)
+            manifest = {}
+            if os.path.exists(manifest_path):
+                with open(manifest_path, "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+                if manifest.get("versions") != _versions():
+                    manifest = {}
+            self._manifest = manifest.get("tables", {})
+        return self._manifest
+
+    def load(self, path, reader, sources=None):
+        rel_path = os.path.relpath(path, self.root)
+        entry = self.manifest.get("{}|{}".format(rel_path, reader))
+        if entry is None:
+            return None
+        try:
+            if _source_stat(sources or [path], self.root) != entry["sources"]:
+                return None
+            return _read_table(entry, os.path.join(self.path, entry["dir"]))
+        except (OSError, ValueError, KeyError, pickle.UnpicklingError):
+            return None
+
+
+def load_all_tables(snapshot=False):
+    """
+    Load every table the tools use into the process's SandboxDatabase,
+    parsed from the source files unless `snapshot`.
+    """
+    from chinatravel.environment.sandbox_db import SandboxDatabase
+    from chinatravel.environment.tools import (
+        Attractions,
+        Accommodations,
+        Restaurants,
+        IntercityTransport,
+        Transportation,
+        Poi,
+    )
+
+    db = SandboxDatabase.get_instance()
+    db.configure(lazy=False, snapshot=snapshot)
+    for tool in [
+        Attractions,
+        Accommodations,
+        Restaurants,
+        IntercityTransport,
+        Poi,
+    ]:
+        tool()
+    # tables that are otherwise only built on first use
+    transportation = Transportation()
+    for city in transportation.city_list:
+        transportation.poi_nearest_station[city]
+    return db
+
+
+def compile_database(verbose=True):
+    """
+    Load every table the tools use and write them into `database/.snapshot`.
+    """
+    db = load_all_tables()
+    root = db.root
+    out = os.path.join(root, SNAPSHOT_DIR)
+    os.makedirs(out, exist_ok=True)
+    tables = {}
+    for key, table in db.items():
+        path, reader = key
+        rel_path = os.path.relpath(path, root)
+        if rel_path.startswith(".."):
+            continue
+        name = "{}|{}".format(rel_path, reader)
+        entry = _write_table(table, os.path.join(out, _entry_dir(rel_path, reader)))
+        entry["dir"] = _entry_dir(rel_path, reader)
+        entry["sources"] = _source_stat(db.sources(key), root)
+        tables[name] = entry
+        if verbose:
+            print("{:<60} {:>8}  {}".format(name, len(table), entry["format"]))
+    with open(os.path.join(out, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(
+            {"versions": _versions(), "tables": tables},
+            f,
+            ensure_ascii=False,
+            indent=1,
+        )
+    return out
+
+
+if __name__ == "__main__":
+    project_root_path = os.path.dirname(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    if project_root_path not in sys.path:
+        sys.path.insert(0, project_root_path)
+
+    parser = argparse.ArgumentParser(
+        description="Compile the sandbox database into a columnar snapshot."
+    )
+    parser.add_argument("--quiet", "-q", action="store_true")
+    args = parser.parse_args()
+    print("snapshot written to", compile_database(verbose=not args.quiet))
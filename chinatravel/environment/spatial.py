@@ -0,0 +1,153 @@
+import numpy as np
+from pandas import DataFrame
+
+from chinatravel.environment.distance import EARTH_RADIUS_KM, haversine, one_to_many
+
+# haversine on the mean-radius sphere is within 0.6% of the WGS-84 geodesic,
+# so candidates are collected with this much slack before the exact re-rank.
+HAVERSINE_MARGIN = 0.01
+
+
+class SpatialIndex:
+    """
+    Ball tree over the (lat, lon) of a table's rows with the haversine metric.
+    Queries return row positions and haversine distances in km. The tools
+    build one per city on the first `nearby` call.
+    """
+
+    def __init__(self, lat, lon):
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        valid = np.isfinite(lat) & np.isfinite(lon)
+        self.positions = np.flatnonzero(valid)
+        self.lat = lat
+        self.lon = lon
+        self.size = len(self.positions)
+        if self.size > 0:
+            from sklearn.neighbors import BallTree
+
+            self.tree = BallTree(
+                np.radians(np.c_[lat[valid], lon[valid]]), metric="haversine"
+            )
+
+    @classmethod
+    def from_table(cls, data: DataFrame, lat="lat", lon="lon"):
+        return cls(data[lat].values, data[lon].values)
+
+    def radius(self, lat, lon, dist):
+        if self.size == 0:
+            return np.array([], dtype=int), np.array([])
+        ind, d = self.tree.query_radius(
+            np.radians([[lat, lon]]), r=dist / EARTH_RADIUS_KM, return_distance=True
+        )
+        return self.positions[ind[0]], d[0] * EARTH_RADIUS_KM
+
+    def knn(self, lat, lon, k):
+        k = min(k, self.size)
+        if k == 0:
+            return np.array([], dtype=int), np.array([])
+        d, ind = self.tree.query(np.radians([[lat, lon]]), k=k)
+        return self.positions[ind[0]], d[0] * EARTH_RADIUS_KM
+
+
+def exact_distance(index: SpatialIndex, lat, lon, positions, mode="geodesic"):
+    return one_to_many(
+        (lat, lon), np.c_[index.lat[positions], index.lon[positions]], mode=mode
+    )
+
+
+def nearby_rows(
+    data: DataFrame,
+    index: SpatialIndex,
+    lat,
+    lon,
+    topk=None,
+    dist=None,
+    inclusive=True,
+    exact=True,
+):
+    """
+    Rows of `data` around (lat, lon), with a `distance` column in km, sorted
+    by distance and limited to `dist` (`<=` if `inclusive`, else `<`) and to
+    the first `topk`. With `exact`, rows are ranked by the ellipsoidal distance
+    and report geopy's geodesic, as in the original linear scan; otherwise the
+    haversine distances from the index are used.
+    """
+    margin = 1 + HAVERSINE_MARGIN if exact else 1
+    if topk is not None and topk <= 0:
+        candidates = np.array([], dtype=int)
+    elif topk is None:
+        if dist is None:
+            candidates = index.positions
+        else:
+            candidates, _ = index.radius(lat, lon, dist * margin)
+    else:
+        candidates, approx = index.knn(lat, lon, topk)
+        radius = approx.max() * margin if len(approx) else 0
+        if exact and len(candidates):
+            radius = exact_distance(index, lat, lon, candidates).max() * margin
+        if dist is not None:
+            radius = min(radius, dist * margin)
+        candidates, _ = index.radius(lat, lon, radius)
+
+    candidates = np.sort(candidates)
+    if exact:
+        distance = exact_distance(index, lat, lon, candidates)
+    else:
+        distance = EARTH_RADIUS_KM * haversine(
+            lat, lon, index.lat[candidates], index.lon[candidates]
+        )
+    if dist is not None:
+        keep = distance <= dist if inclusive else distance < dist
+        candidates, distance = candidates[keep], distance[keep]
+
+    order = np.argsort(distance, kind="stable")[:topk]
+    candidates, distance = candidates[order], distance[order]
+    if exact and len(candidates):
+        # ranked by Vincenty, reported as geopy computes them
+        distance = exact_distance(index, lat, lon, candidates, mode="exact")
+        order = np.argsort(distance, kind="stable")
+        candidates, distance = candidates[order], distance[order]
+
+    tmp = data.iloc[candidates].copy()
+    tmp["distance"] = distance
+    return tmp
+
+
+if __name__ == "__main__":
+    import time
+
+    from geopy.distance import geodesic
+
+    rng = np.random.default_rng(0)
+    lat = 31.2 + rng.random(5000) * 0.5
+    lon = 121.3 + rng.random(5000) * 0.5
+    data = DataFrame({"lat": lat, "lon": lon})
+    index = SpatialIndex.from_table(data)
+    for (q_lat, q_lon), topk, dist in [
+        ((31.45, 121.55), None, 2),
+        ((31.45, 121.55), 10, 2),
+        ((31.3, 121.4), 5, None),
+        ((31.7, 121.8), None, 1),
+    ]:
+        start = time.time()
+        res = nearby_rows(data, index, q_lat, q_lon, topk=topk, dist=dist)
+        fast = time.time() - start
+        start = time.time()
+        tmp = data.copy()
+        tmp["distance"] = [
+            geodesic((q_lat, q_lon), (x, y)).km for x, y in zip(lat, lon)
+        ]
+        tmp = tmp.sort_values(by=["distance"], kind="stable")
+        if dist is not None:
+            tmp = tmp[tmp["distance"] <= dist]
+        if topk is not None:
+            tmp = tmp.head(topk)
+        slow = time.time() - start
+        assert list(res.index) == list(tmp.index)
+        assert res["distance"].tolist() == tmp["distance"].tolist()
+        print(
+            "topk={} dist={}: {} rows, index {:.4f}s, scan {:.4f}s".format(
+                topk, dist, len(res), fast, slow
+            )
+        )
@@ -0,0 +1,140 @@
+"""
+Clock times as integer minutes since midnight, the one time type shared by
+the tools and the verifiers. "HH:MM" strings are parsed once (and cached),
+so comparisons in hot loops are integer comparisons.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+MINUTES_PER_DAY = 24 * 60
+# opening hours of a place that is not open that day ("不营业")
+CLOSED = -1
+
+
+@lru_cache(maxsize=65536)
+def to_minutes(time_str: str):
+    """
+    'HH:MM' to minutes since midnight. Like the parsers it replaces, only
+    the first two fields are read ('HH:MM:SS' works) and hours past 24 are
+    kept. Raises on anything else.
+    """
+    parts = time_str.split(":")
+    try:
+        return int(parts[0]) * 60 + int(parts[1])
+    except ValueError:
+        return float(parts[0]) * 60 + float(parts[1])
+
+
+def to_time(minutes) -> str:
+    """Minutes since midnight to 'HH:MM'; hours are not wrapped at 24."""
+    hour, minute = divmod(int(minutes), 60)
+    return "{:02d}:{:02d}".format(hour, minute)
+
+
+def add_minutes(time_str: str, minutes) -> str:
+    return to_time(to_minutes(time_str) + minutes)
+
+
+def minutes_between(start: str, end: str):
+    return to_minutes(end) - to_minutes(start)
+
+
+def opening_minutes(value):
+    """An opentime/endtime cell to minutes, CLOSED for '不营业' or no value."""
+    try:
+        return to_minutes(value)
+    except (AttributeError, TypeError, ValueError, IndexError):
+        return CLOSED
+
+
+def opening_column(values) -> np.ndarray:
+    return np.array([opening_minutes(value) for value in values], dtype=float)
+
+
+def is_open(open_time, end_time, time) -> bool:
+    """
+    Whether a place with these opening hours (minutes) is open at `time`.
+    An end before the open time means open over midnight.
+    """
+    if open_time == CLOSED or end_time == CLOSED:
+        return False
+    if open_time < end_time:
+        return open_time <= time <= end_time
+    return open_time <= time or time <= end_time
+
+
+def open_mask(open_time: np.ndarray, end_time: np.ndarray, time) -> np.ndarray:
+    """`is_open` over arrays of opening hours."""
+    return np.where(
+        open_time < end_time,
+        (open_time <= time) & (time <= end_time),
+        (open_time <= time) | (time <= end_time),
+    ) & ~((open_time == CLOSED) | (end_time == CLOSED))
+
+
+def times_to_minutes(times) -> np.ndarray:
+    """A time or a sequence of times ('HH:MM' or minutes) to an array of minutes."""
+    if isinstance(times, str):
+        return np.array(to_minutes(times), dtype=float)
+    times = np.asarray(times)
+    if times.dtype.kind in "iuf":
+        return times.astype(float)
+    return np.array([to_minutes(t) for t in times.ravel()], dtype=float).reshape(
+        times.shape
+    )
+
+
+class OpeningHours:
+    """
+    Opening hours of a table in minutes, in arrays indexed by the integer
+    `id` column: `open_time[position[id]]`. The first row of an id wins,
+    as with `data[data["id"] == id].values[0]`.
+    """
+
+    def __init__(self, data, key="id"):
+        ids = data[key].to_numpy()
+        self.open_time = opening_column(data["opentime"])
+        self.end_time = opening_column(data["endtime"])
+        valid = np.flatnonzero(
+            (ids == np.round(ids)) & (ids >= 0) if ids.dtype.kind in "iuf" else []
+        )
+        unique, first = np.unique(ids[valid].astype(np.int64), return_index=True)
+        size = int(unique[-1]) + 1 if len(unique) else 0
+        self.position = np.full(size, -1, dtype=np.int64)
+        self.position[unique] = valid[first]
+
+    def lookup(self, ids) -> np.ndarray:
+        """Row positions of `ids`, -1 where an id is not in the table."""
+        ids = np.asarray(ids)
+        res = np.full(ids.shape, -1, dtype=np.int64)
+        if ids.dtype.kind not in "iuf":
+            return res
+        known = (ids == np.round(ids)) & (ids >= 0) & (ids < len(self.position))
+        res[known] = self.position[ids[known].astype(np.int64)]
+        return res
+
+    def get(self, id):
+        """(open_time, end_time) of one id, None if it is not in the table."""
+        try:
+            i = int(id)
+        except (TypeError, ValueError):
+            return None
+        if i != id or not 0 <= i < len(self.position) or self.position[i] < 0:
+            return None
+        i = self.position[i]
+        return float(self.open_time[i]), float(self.end_time[i])
+
+    def is_open(self, ids, times) -> np.ndarray:
+        """
+        Boolean vector: whether each id is open at its time. `times` is one
+        time for all ids or one per id, as 'HH:MM' or minutes.
+        """
+        positions = self.lookup(ids)
+        if (positions < 0).any():
+            missing = np.asarray(ids)[positions < 0].ravel()[0]
+            raise IndexError("No row with id {}.".format(missing))
+        return open_mask(
+            self.open_time[positions], self.end_time[positions], times_to_minutes(times)
+        )
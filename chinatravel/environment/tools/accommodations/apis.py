@@ -1,13 +1,20 @@
 import pandas as pd
 from pandas import DataFrame
 from typing import Callable
-from geopy.distance import geodesic
 import os
 
 import sys
 
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 from poi.apis import Poi
+from chinatravel.environment.sandbox_db import (
+    SandboxDatabase,
+    LazyTables,
+    read_csv_dropna,
+)
+from chinatravel.environment.indexes import build_name_index, lookup
+from chinatravel.environment.predicates import select_rows
+from chinatravel.environment.spatial import SpatialIndex, nearby_rows
 
 
 class Accommodations:
@@ -28,20 +35,6 @@ class Accommodations:
             "guangzhou",
             "chongqing",
         ]
-        data_path_list = [
-            os.path.join(curdir, f"{base_path}/{city}/accommodations.csv")
-            for city in city_list
-        ]
-        self.data = {}
-        for i, city in enumerate(city_list):
-            self.data[city] = pd.read_csv(data_path_list[i]).dropna()
-        self.key_type_tuple_list = {}
-        for city in city_list:
-            self.key_type_tuple_list[city] = []
-            for key in self.data[city].keys():
-                self.key_type_tuple_list[city].append(
-                    (key, type(self.data[city].iloc[0][key]))
-                )
         city_cn_list = [
             "北京",
             "上海",
@@ -54,41 +47,67 @@ class Accommodations:
             "广州",
             "重庆",
         ]
-
-        for i, city in enumerate(city_list):
-            self.data[city_cn_list[i]] = self.data.pop(city)
-            self.key_type_tuple_list[city_cn_list[i]] = self.key_type_tuple_list.pop(
-                city
-            )
+        data_path_map = {
+            city_cn: os.path.join(curdir, f"{base_path}/{city}/accommodations.csv")
+            for city, city_cn in zip(city_list, city_cn_list)
+        }
+        db = SandboxDatabase.get_instance()
+        self.data = db.tables(
+            city_cn_list, lambda city: db.load(data_path_map[city], read_csv_dropna)
+        )
+        self.name_index = db.tables(
+            city_cn_list,
+            lambda city: db.derive(
+                data_path_map[city], read_csv_dropna, "names", build_name_index
+            ),
+        )
+        self.spatial_index = LazyTables(
+            city_cn_list,
+            lambda city: db.derive(
+                data_path_map[city],
+                read_csv_dropna,
+                "spatial",
+                SpatialIndex.from_table,
+            ),
+        )
+        self.key_type_tuple_list = db.tables(
+            city_cn_list,
+            lambda city: db.derive(
+                data_path_map[city],
+                read_csv_dropna,
+                "key_types",
+                lambda data: [(key, type(data.iloc[0][key])) for key in data.keys()],
+            ),
+        )
 
         self.poi = Poi(en_version=en_version)
 
     def keys(self, city):
         return self.key_type_tuple_list[city]
 
-    def select(self, city, key, func: Callable) -> DataFrame:
-        if key not in self.data[city].keys():
-            return "Key not found."
-        bool_list = [func(x) for x in self.data[city][key]]
-        return self.data[city][bool_list]
+    def select(self, city, key=None, func: Callable = None) -> DataFrame:
+        return select_rows(self.data[city], key, func)
 
-    def nearby(self, city, point: str, topk: int = None, dist: float = 5) -> DataFrame:
+    def get_by_name(self, city, name: str) -> DataFrame:
+        return lookup(self.data[city], self.name_index[city], name)
+
+    def nearby(
+        self, city, point: str, topk: int = None, dist: float = 5, exact=True
+    ) -> DataFrame:
         lat_lon = self.poi.search(city, point)
         if isinstance(lat_lon, str):
             return lat_lon
         lat, lon = lat_lon
-        distance = [
-            geodesic((lat, lon), (x, y)).km
-            for x, y in zip(self.data[city]["lat"], self.data[city]["lon"])
-        ]
-        tmp = self.data[city].copy()
-        tmp["distance"] = distance
-        if dist is not None:
-            tmp = tmp[tmp["distance"] < dist]
-        tmp = tmp.sort_values(by=["distance"])
-        if topk is not None:
-            return tmp.head(topk)
-        return tmp
+        return nearby_rows(
+            self.data[city],
+            self.spatial_index[city],
+            lat,
+            lon,
+            topk=topk,
+            dist=dist,
+            inclusive=False,
+            exact=exact,
+        )
 
 
 if __name__ == "__main__":
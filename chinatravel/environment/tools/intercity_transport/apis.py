@@ -1,11 +1,79 @@
 import os
+import numpy as np
 import pandas as pd
 from pandas import DataFrame
 
+from chinatravel.environment.sandbox_db import (
+    SandboxDatabase,
+    read_json_table,
+    read_jsonl_table,
+    read_only,
+)
+from chinatravel.environment.timeutil import MINUTES_PER_DAY, to_minutes
+
 
 def time2float(time_str):
-    h, m = time_str.split(":")
-    return int(h) + int(m) / 60
+    return to_minutes(time_str) / 60
+
+
+class Timetable:
+    """
+    Trains or flights of one (origin, destination), sorted by BeginTime as
+    `IntercityTransport.select` returns them, with departures parsed to
+    minutes. Departure windows are found by binary search and returned as
+    read-only slices of the sorted table, without copying it.
+    """
+
+    def __init__(self, data: DataFrame):
+        self.data = read_only(data.sort_values(by="BeginTime").reset_index(drop=True))
+        self.depart = np.array(
+            [to_minutes(t) for t in self.data["BeginTime"]], dtype=float
+        )
+        # "HH:MM" sorts like the minutes; anything else falls back to a scan
+        self.ordered = bool(np.all(np.diff(self.depart) >= 0))
+        self._arrive = None
+
+    @property
+    def arrive(self):
+        """Arrival in minutes after midnight of the departure day."""
+        if self._arrive is None:
+            arrive = np.array(
+                [to_minutes(t) for t in self.data["EndTime"]], dtype=float
+            )
+            self._arrive = np.where(
+                arrive < self.depart, arrive + MINUTES_PER_DAY, arrive
+            )
+        return self._arrive
+
+    def window(
+        self, leave_after=None, leave_before=None, arrive_by=None, max_cost=None
+    ):
+        """
+        Rows departing in [leave_after, leave_before], arriving by `arrive_by`
+        on the same day and costing at most `max_cost`. Times are 'HH:MM'.
+        """
+        lo, hi = 0, len(self.depart)
+        if self.ordered:
+            if leave_after is not None:
+                lo = np.searchsorted(self.depart, to_minutes(leave_after), "left")
+            if leave_before is not None:
+                hi = np.searchsorted(self.depart, to_minutes(leave_before), "right")
+            keep = None
+        else:
+            keep = np.ones(hi, dtype=bool)
+            if leave_after is not None:
+                keep &= self.depart >= to_minutes(leave_after)
+            if leave_before is not None:
+                keep &= self.depart <= to_minutes(leave_before)
+        res = self.data.iloc[lo:hi]
+        if arrive_by is None and max_cost is None and keep is None:
+            return res
+        keep = np.ones(len(res), dtype=bool) if keep is None else keep
+        if arrive_by is not None:
+            keep &= self.arrive[lo:hi] <= to_minutes(arrive_by)
+        if max_cost is not None:
+            keep &= res["Cost"].values <= max_cost
+        return read_only(res[keep])
 
 
 class IntercityTransport:
@@ -13,9 +81,9 @@ class IntercityTransport:
         curdir = os.path.dirname(os.path.realpath(__file__))
         self.base_path = os.path.join(curdir, path)
         self.airplane_path = self.base_path + "airplane.jsonl"
-        self.airplane_df = pd.read_json(
-            self.airplane_path, lines=True, keep_default_dates=False
-        )
+        db = SandboxDatabase.get_instance()
+        if not db.lazy:
+            db.load(self.airplane_path, read_jsonl_table)
         city_list = [
             "上海",
             "北京",
@@ -28,57 +96,87 @@ class IntercityTransport:
             "武汉",
             "南京",
         ]
-        self.train_df_dict = {}
-
-        for start_city in city_list:
-            for end_city in city_list:
-                if start_city == end_city:
-                    continue
-                train_path = (
-                    self.base_path
-                    + "train/"
-                    + "from_{}_to_{}.json".format(start_city, end_city)
-                )
-                train_df = pd.read_json(train_path)
-                self.train_df_dict[(start_city, end_city)] = train_df
+        city_pairs = [
+            (start_city, end_city)
+            for start_city in city_list
+            for end_city in city_list
+            if start_city != end_city
+        ]
+        self.train_df_dict = db.tables(city_pairs, self._load_train)
+
+    @property
+    def airplane_df(self) -> DataFrame:
+        return SandboxDatabase.get_instance().load(
+            self.airplane_path, read_jsonl_table
+        )
+
+    def _load_train(self, city_pair) -> DataFrame:
+        train_path = (
+            self.base_path + "train/" + "from_{}_to_{}.json".format(*city_pair)
+        )
+        return SandboxDatabase.get_instance().load(train_path, read_json_table)
 
     def select(
-        self, start_city, end_city, intercity_type, earliest_leave_time="00:00"
+        self,
+        start_city,
+        end_city,
+        intercity_type,
+        earliest_leave_time="00:00",
+        latest_leave_time=None,
+        arrive_by=None,
+        max_cost=None,
     ) -> DataFrame:
         if intercity_type not in ["train", "airplane"]:
             return "only support intercity_type in ['train','airplane']"
-        res = self._select(start_city, end_city, intercity_type)
-        bool_list = [False] * len(res)
-        for i in range(len(res)):
-            if time2float(res.loc[i, "BeginTime"]) >= time2float(earliest_leave_time):
-                bool_list[i] = True
-        return res[bool_list]
+        timetable = self.timetable(start_city, end_city, intercity_type)
+        res = None if timetable is None else timetable.data
+        # as before, a route without any data fails on len(None)
+        if len(res) == 0:
+            return res
+        return timetable.window(
+            earliest_leave_time, latest_leave_time, arrive_by, max_cost
+        )
 
-    def _select(self, start_city, end_city, intercity_type) -> DataFrame:
-        # intercity_type=='train' | 'airplane'
+    def timetable(self, start_city, end_city, intercity_type) -> Timetable:
+        """
+        Cached `Timetable` of a route, None if there is no data for it.
+        """
+        db = SandboxDatabase.get_instance()
         if intercity_type == "airplane":
 
             if len(self.airplane_df) == 0:
                 return None
 
-            filtered_flights = self.airplane_df[
-                (self.airplane_df["From"].str.contains(start_city))
-                & (self.airplane_df["To"].str.contains(end_city))
-            ]
-            sorted_flights = filtered_flights.sort_values(by="BeginTime").reset_index(
-                drop=True
+            def build(airplane_df):
+                return Timetable(
+                    airplane_df[
+                        (airplane_df["From"].str.contains(start_city))
+                        & (airplane_df["To"].str.contains(end_city))
+                    ]
+                )
+
+            return db.derive(
+                self.airplane_path,
+                read_jsonl_table,
+                ("timetable", start_city, end_city),
+                build,
             )
-            return sorted_flights
         if intercity_type == "train":
 
             if len(self.train_df_dict[(start_city, end_city)]) == 0:
                 return None
 
-            filtered_trains = self.train_df_dict[(start_city, end_city)]
-            sorted_trains = filtered_trains.sort_values(by="BeginTime").reset_index(
-                drop=True
+            train_path = self.base_path + "train/" + "from_{}_to_{}.json".format(
+                start_city, end_city
             )
-            return sorted_trains
+            return db.derive(train_path, read_json_table, "timetable", Timetable)
+
+    def _select(self, start_city, end_city, intercity_type) -> DataFrame:
+        # intercity_type=='train' | 'airplane'
+        timetable = self.timetable(start_city, end_city, intercity_type)
+        if timetable is None:
+            return None
+        return timetable.data
 
 
 if __name__ == "__main__":
@@ -1,5 +1,6 @@
 import os
-import json
+
+from chinatravel.environment.sandbox_db import SandboxDatabase, read_poi
 
 
 class Poi:
@@ -17,22 +18,6 @@ class Poi:
             "guangzhou",
             "chongqing",
         ]
-        curdir = os.path.dirname(os.path.realpath(__file__))
-        data_path_list = [
-            os.path.join(curdir, f"{base_path}/{city}/poi.json") for city in city_list
-        ]
-        self.data = {}
-        for i, city in enumerate(city_list):
-            self.data[city] = json.load(open(data_path_list[i], "r", encoding="utf-8"))
-            city_data = {}
-            for name_pos in self.data[city]:
-                name = name_pos["name"]
-                pos = name_pos["position"]
-                city_data[name] = tuple(pos)
-            self.data[city] = city_data
-            # self.data[city] = [
-            #     (x["name"], tuple(x["position"])) for x in self.data[city]
-            # ]
         city_cn_list = [
             "北京",
             "上海",
@@ -45,8 +30,16 @@ class Poi:
             "广州",
             "重庆",
         ]
-        for i, city in enumerate(city_list):
-            self.data[city_cn_list[i]] = self.data.pop(city)
+        curdir = os.path.dirname(os.path.realpath(__file__))
+        data_path_map = {
+            city_cn: os.path.join(curdir, f"{base_path}/{city}/poi.json")
+            for city, city_cn in zip(city_list, city_cn_list)
+        }
+        self.data_path_map = data_path_map
+        db = SandboxDatabase.get_instance()
+        self.data = db.tables(
+            city_cn_list, lambda city: db.load(data_path_map[city], read_poi)
+        )
         self.city_cn_list = city_cn_list
         self.city_list = city_list
 
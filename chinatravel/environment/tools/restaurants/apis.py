@@ -1,13 +1,29 @@
+import numpy as np
 import pandas as pd
+import re
 from pandas import DataFrame
 from typing import Callable
 import os
-from geopy.distance import geodesic
 
 import sys
 
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 from poi.apis import Poi
+from chinatravel.environment.sandbox_db import SandboxDatabase, LazyTables, read_csv
+from chinatravel.environment.indexes import (
+    NgramIndex,
+    build_name_index,
+    build_token_index,
+    lookup,
+    positions,
+)
+from chinatravel.environment.predicates import select_rows
+from chinatravel.environment.spatial import SpatialIndex, nearby_rows
+from chinatravel.environment.timeutil import OpeningHours, is_open, to_minutes
+
+
+_REGEX_SPECIAL = re.compile(r"[.^$*+?{}\[\]\\|()]")
+_EMPTY = positions([])
 
 
 class Restaurants:
@@ -24,22 +40,6 @@ class Restaurants:
             "guangzhou",
             "chongqing",
         ]
-        self.data = {}
-        curdir = os.path.dirname(os.path.realpath(__file__))
-        for city in city_list:
-            path = os.path.join(curdir, base_path, city, "restaurants_" + city + ".csv")
-            self.data[city] = pd.read_csv(path)
-
-        self.key_type_tuple_list_map = {}
-        for city in city_list:
-            self.key_type_tuple_list_map[city] = []
-            for key in self.data[city].keys():
-                self.key_type_tuple_list_map[city].append(
-                    (key, type(self.data[city][key][0]))
-                )
-        self.cuisine_list_map = {}
-        for city in city_list:
-            self.cuisine_list_map[city] = self.data[city]["cuisine"].unique()
         city_cn_list = [
             "北京",
             "上海",
@@ -52,65 +52,133 @@ class Restaurants:
             "广州",
             "重庆",
         ]
-
-        for i, city in enumerate(city_list):
-            self.data[city_cn_list[i]] = self.data.pop(city)
-            self.key_type_tuple_list_map[city_cn_list[i]] = (
-                self.key_type_tuple_list_map.pop(city)
+        curdir = os.path.dirname(os.path.realpath(__file__))
+        data_path_map = {
+            city_cn: os.path.join(
+                curdir, base_path, city, "restaurants_" + city + ".csv"
             )
-            self.cuisine_list_map[city_cn_list[i]] = self.cuisine_list_map.pop(city)
+            for city, city_cn in zip(city_list, city_cn_list)
+        }
+
+        db = SandboxDatabase.get_instance()
+
+        def load(city):
+            return db.load(data_path_map[city], read_csv)
+
+        def derive(name, func):
+            return lambda city: db.derive(data_path_map[city], read_csv, name, func)
+
+        self.data = db.tables(city_cn_list, load)
+        self.name_index = db.tables(city_cn_list, derive("names", build_name_index))
+        self.spatial_index = LazyTables(
+            city_cn_list, derive("spatial", SpatialIndex.from_table)
+        )
+        self.opening_hours = db.tables(
+            city_cn_list, derive("opening_hours", OpeningHours)
+        )
+        self.key_type_tuple_list_map = db.tables(
+            city_cn_list,
+            derive(
+                "key_types",
+                lambda data: [(key, type(data[key][0])) for key in data.keys()],
+            ),
+        )
+        self.cuisine_list_map = db.tables(
+            city_cn_list,
+            derive("cuisines", lambda data: pd.unique(data["cuisine"].to_numpy())),
+        )
+        self.cuisine_index = LazyTables(
+            city_cn_list,
+            derive(
+                "cuisine_index",
+                lambda data: {
+                    cuisine: positions(rows)
+                    for cuisine, rows in build_name_index(data, "cuisine").items()
+                },
+            ),
+        )
+        self.food_index = LazyTables(
+            city_cn_list,
+            derive(
+                "food_index",
+                lambda data: NgramIndex.from_table(data, "recommendedfood"),
+            ),
+        )
+        self.dish_index = LazyTables(
+            city_cn_list,
+            derive(
+                "dish_index", lambda data: build_token_index(data, "recommendedfood")
+            ),
+        )
 
         self.poi = Poi()
 
     def keys(self, city: str):
         return self.key_type_tuple_list_map[city]
 
-    def select(self, city: str, key, func: Callable) -> DataFrame:
-        if key not in self.data[city].keys():
-            return "Key not found."
-        bool_list = [func(x) for x in self.data[city][key]]
-        return self.data[city][bool_list]
+    def select(self, city: str, key=None, func: Callable = None) -> DataFrame:
+        return select_rows(self.data[city], key, func)
+
+    def get_by_name(self, city: str, name: str) -> DataFrame:
+        return lookup(self.data[city], self.name_index[city], name)
 
     def id_is_open(self, city: str, id: int, time: str) -> bool:
-        match = self.data[city].loc[self.data[city]["id"] == id]
-        open_time = match["opentime"].values[0]
-        end_time = match["endtime"].values[0]
-        open_time = (
-            -1
-            if open_time == "不营业"
-            else float(open_time.split(":")[0]) + float(open_time.split(":")[1]) / 60
-        )
-        end_time = (
-            -1
-            if end_time == "不营业"
-            else float(end_time.split(":")[0]) + float(end_time.split(":")[1]) / 60
-        )
-        time = float(time.split(":")[0]) + float(time.split(":")[1]) / 60
-        if open_time == -1 or end_time == -1:
-            return False
-        if open_time < end_time:
-            return open_time <= time <= end_time
-        else:
-            return open_time <= time or time <= end_time
-
-    def nearby(self, city: str, point: str, topk: int = None, dist=2) -> DataFrame:
+        hours = self.opening_hours[city].get(id)
+        if hours is None:
+            raise IndexError("No restaurant with id {} in {}.".format(id, city))
+        return is_open(*hours, to_minutes(time))
+
+    def ids_are_open(self, city: str, ids, times) -> np.ndarray:
+        """
+        `id_is_open` for many ids at once: a boolean vector, with `times` one
+        'HH:MM' for all ids or one per id.
+        """
+        return self.opening_hours[city].is_open(ids, times)
+
+    def nearby(
+        self, city: str, point: str, topk: int = None, dist=2, exact=True
+    ) -> DataFrame:
         lat_lon = self.poi.search(city, point)
         if isinstance(lat_lon, str):
             return lat_lon
         lat, lon = lat_lon
-        distance = [
-            geodesic((lat, lon), (x, y)).km
-            for x, y in zip(self.data[city]["lat"], self.data[city]["lon"])
-        ]
-        tmp = self.data[city].copy()
-        tmp["distance"] = distance
-        tmp = tmp.sort_values(by=["distance"])
-        if topk is None:
-            return tmp[tmp["distance"] <= dist]
-        return tmp[tmp["distance"] <= dist].head(topk)
+        return nearby_rows(
+            self.data[city],
+            self.spatial_index[city],
+            lat,
+            lon,
+            topk=topk,
+            dist=dist,
+            exact=exact,
+        )
 
     def restaurants_with_recommended_food(self, city: str, food: str):
-        return self.data[city][self.data[city]["recommendedfood"].str.contains(food)]
+        if not isinstance(food, str) or _REGEX_SPECIAL.search(food):
+            # `str.contains` treats `food` as a pattern
+            return self.data[city][
+                self.data[city]["recommendedfood"].str.contains(food)
+            ]
+        return self.data[city].iloc[self.food_index[city].search(food)]
+
+    def food_positions(self, city: str, food: str, exact: bool = False):
+        """
+        Sorted row positions of the restaurants recommending `food`: as a
+        substring of `recommendedfood`, or one of its dishes if `exact`.
+        Combine with `cuisine_positions` etc. by `np.intersect1d`. The array
+        may be the index's own posting and is read-only.
+        """
+        if exact:
+            return self.dish_index[city].get(food, _EMPTY)
+        return self.food_index[city].search(food)
+
+    def cuisine_positions(self, city: str, cuisine) -> np.ndarray:
+        """Sorted row positions of the restaurants of one or more cuisines."""
+        index = self.cuisine_index[city]
+        if isinstance(cuisine, str):
+            return index.get(cuisine, _EMPTY)
+        return np.unique(
+            np.concatenate([_EMPTY] + [index.get(c, _EMPTY) for c in cuisine])
+        )
 
     def get_cuisine_list(self, city: str):
         return self.cuisine_list_map[city]
@@ -1,16 +1,25 @@
 import os
-import json
 import heapq
-from geopy.distance import geodesic
+import pickle
+import numpy as np
+from pandas import DataFrame
 
 from chinatravel.environment.tools.poi.apis import Poi
+from chinatravel.environment.sandbox_db import (
+    SandboxDatabase,
+    LazyTables,
+    read_json,
+    read_poi,
+)
+from chinatravel.environment.spatial import SpatialIndex, HAVERSINE_MARGIN
+from chinatravel.environment.distance import distance as geo_distance, one_to_many
+from chinatravel.environment.timeutil import add_minutes, minutes_between
 
 
 def get_lines_and_stations(city, SUBWAY_PATH):
     stations_all = []
     metro_lines = {}
-    with open(SUBWAY_PATH, "r", encoding="utf-8") as file:
-        subway_data = json.load(file)
+    subway_data = SandboxDatabase.get_instance().load(SUBWAY_PATH, read_json)
     for line in subway_data[city]:
         metro_lines[line["name"]] = []
         for station in line["stations"]:
@@ -46,45 +55,26 @@ def get_line_change(station_to_line, path):
 
 
 def add_time(time1, hours):
-
-    hour, minu = int(time1.split(":")[0]), int(time1.split(":")[1])
-
-    time_delta = int(hours * 60)
-    min_new = minu + time_delta
-
-    if min_new >= 60:
-        hour_new = hour + int(min_new / 60)
-        min_new = min_new % 60
-    else:
-        hour_new = hour
-
-    if hour_new < 10:
-        time_new = "0" + str(hour_new) + ":"
-    else:
-        time_new = str(hour_new) + ":"
-    if min_new < 10:
-
-        time_new = time_new + "0" + str(min_new)
-    else:
-        time_new = time_new + str(min_new)
-
-    return time_new
+    return add_minutes(time1, int(hours * 60))
 
 
 def dijkstra(graph, start, end):
-    queue = [(0, start, [])]
-    seen = set()
+    queue = [(0, start, None)]
+    parent = {}
     while queue:
-        (cost, node, path) = heapq.heappop(queue)
-        if node in seen:
+        (cost, node, prev) = heapq.heappop(queue)
+        if node in parent:
             continue
-        path = path + [node]
-        seen.add(node)
+        parent[node] = prev
         if node == end:
-            return path
+            path = []
+            while node is not None:
+                path.append(node)
+                node = parent[node]
+            return path[::-1]
         for next_node in graph.get(node, []):
-            if next_node not in seen:
-                heapq.heappush(queue, (cost + 1, next_node, path))
+            if next_node not in parent:
+                heapq.heappush(queue, (cost + 1, next_node, node))
     return []
 
 
@@ -92,15 +82,243 @@ def find_shortest_path(graph, start, end):
     return dijkstra(graph, start, end)
 
 
+SUBWAY_SPEED = 30.0  # km/h, as in `goto`
+TRANSFER_MINUTES = 5.0
+
+
+class MetroNetwork:
+    """
+    Line-aware metro graph of one city with all-pairs routes.
+
+    Nodes are (station, line) platforms plus one node per station. Riding
+    between neighbouring stations of a line costs the travel time at
+    SUBWAY_SPEED, entering or leaving a platform costs half of
+    TRANSFER_MINUTES, so every change of line adds TRANSFER_MINUTES. The
+    shortest routes from every station are computed once, on construction;
+    `route` then only follows the stored predecessors.
+    """
+
+    def __init__(self, metro_lines, stations):
+        from scipy.sparse import csr_matrix
+        from scipy.sparse.csgraph import dijkstra as csgraph_dijkstra
+
+        position = {}
+        for station in stations:
+            position.setdefault(station["name"], station["position"])
+        self.stations = list(position)
+        self.index = {name: i for i, name in enumerate(self.stations)}
+        self.lines = {}
+        self.platforms = []
+        platform_index = {}
+        n = len(self.stations)
+        rows, cols, weights = [], [], []
+
+        def platform(name, line):
+            key = (name, line)
+            if key not in platform_index:
+                platform_index[key] = n + len(self.platforms)
+                self.platforms.append(key)
+                self.lines.setdefault(name, []).append(line)
+                node, station = platform_index[key], self.index[name]
+                rows.extend([station, node])
+                cols.extend([node, station])
+                weights.extend([TRANSFER_MINUTES / 2] * 2)
+            return platform_index[key]
+
+        for line, names in metro_lines.items():
+            for a, b in zip(names, names[1:]):
+                u, v = platform(a, line), platform(b, line)
+                minutes = geo_distance(position[a], position[b]) / SUBWAY_SPEED * 60
+                rows.extend([u, v])
+                cols.extend([v, u])
+                weights.extend([max(minutes, 1e-6)] * 2)
+            if names:
+                platform(names[0], line)
+
+        size = n + len(self.platforms)
+        graph = csr_matrix((weights, (rows, cols)), shape=(size, size))
+        minutes, self.predecessors = csgraph_dijkstra(
+            graph, indices=range(n), return_predecessors=True
+        )
+        # station to station, without the fixed cost of boarding and alighting
+        self.minutes = minutes[:, :n] - TRANSFER_MINUTES
+        np.fill_diagonal(self.minutes, 0)
+
+    def route(self, start, end):
+        """
+        Fastest route between two stations: its stations, the lines taken,
+        the number of transfers and the riding time in minutes. None if the
+        stations are not connected.
+        """
+        i, j = self.index.get(start), self.index.get(end)
+        if i is None or j is None or not np.isfinite(self.minutes[i, j]):
+            return None
+        n = len(self.stations)
+        names, lines = [self.stations[j]], []
+        node = self.predecessors[i, j]
+        while node >= 0 and node != i:
+            name, line = self.platforms[node - n] if node >= n else (None, None)
+            if name is not None:
+                if name != names[-1]:
+                    names.append(name)
+                if not lines or lines[-1] != line:
+                    lines.append(line)
+            node = self.predecessors[i, node]
+        return {
+            "stations": names[::-1],
+            "lines": lines[::-1],
+            "transfers": max(len(lines) - 1, 0),
+            "minutes": float(self.minutes[i, j]),
+        }
+
+
 def find_nearest_station(location, stations):
-    nearest_station = None
-    min_distance = float("inf")
-    for station in stations:
-        distance = geodesic(location, station["position"]).kilometers
-        if distance < min_distance:
-            min_distance = distance
-            nearest_station = station
-    return nearest_station, min_distance
+    if len(stations) == 0:
+        return None, float("inf")
+    distance = one_to_many(location, [station["position"] for station in stations])
+    best = int(np.argmin(distance))
+    return stations[best], float(distance[best])
+
+
+def build_station_index(stations):
+    return SpatialIndex(
+        [station["position"][0] for station in stations],
+        [station["position"][1] for station in stations],
+    )
+
+
+def find_nearest_station_indexed(location, station_index: SpatialIndex):
+    """
+    Same result as `find_nearest_station`, returned as the station's position
+    in the station list: the haversine nearest station bounds the search
+    radius, and the candidates inside it are compared by exact geodesic,
+    the first station in list order winning ties.
+    """
+    lat, lon = location
+    nearest, approx = station_index.knn(lat, lon, 1)
+    if len(nearest) == 0:
+        return None, float("inf")
+    radius = approx[0] * (1 + HAVERSINE_MARGIN) / (1 - HAVERSINE_MARGIN) + 1e-9
+    candidates, _ = station_index.radius(lat, lon, radius)
+    candidates = np.sort(candidates)
+    distance = one_to_many(
+        location, np.c_[station_index.lat[candidates], station_index.lon[candidates]]
+    )
+    best = int(np.argmin(distance))
+    return int(candidates[best]), float(distance[best])
+
+
+class NearestStationReader:
+    """
+    Reader for the nearest metro station of every POI in a city's poi.json:
+    a table of name, station (position in the city's station list) and
+    walking distance in km. Stored in the database snapshot like any table.
+    """
+
+    __name__ = "read_nearest_stations"
+
+    def __init__(self, city, subway_path):
+        self.city = city
+        self.subway_path = subway_path
+
+    def sources(self, path):
+        return [self.subway_path]
+
+    def __call__(self, path):
+        stations = get_lines_and_stations(self.city, self.subway_path)[0]
+        station_index = build_station_index(stations)
+        rows = []
+        for name, position in read_poi(path).items():
+            station, distance = find_nearest_station_indexed(position, station_index)
+            rows.append((name, -1 if station is None else station, distance))
+        return DataFrame(rows, columns=["name", "station", "distance"])
+
+
+def route_legs(transports):
+    """
+    Start-time independent form of a `goto` result: per leg its endpoints,
+    mode, cost, distance and duration in minutes.
+    """
+    if isinstance(transports, str):
+        return transports
+    return tuple(
+        (
+            leg["start"],
+            leg["end"],
+            leg["mode"],
+            leg["cost"],
+            leg["distance"],
+            minutes_between(leg["start_time"], leg["end_time"]),
+        )
+        for leg in transports
+    )
+
+
+def replay_legs(legs, start_time):
+    if isinstance(legs, str):
+        return legs
+    transports = []
+    for start, end, mode, cost, distance, minutes in legs:
+        end_time = add_minutes(start_time, minutes)
+        transports.append(
+            {
+                "start": start,
+                "end": end,
+                "mode": mode,
+                "start_time": start_time,
+                "end_time": end_time,
+                "cost": cost,
+                "distance": distance,
+            }
+        )
+        start_time = end_time
+    return transports
+
+
+class RouteCache:
+    """
+    (start, end, mode) -> route legs of one city, filled by `goto` as routes
+    are asked for. `save` writes it next to the database snapshot; it is
+    loaded back as long as the city's poi.json and subways.json are unchanged.
+    """
+
+    VERSION = 3
+
+    def __init__(self, path, sources):
+        self.path = path
+        self.fingerprint = [self.VERSION] + [
+            (os.path.basename(p), os.stat(p).st_size, os.stat(p).st_mtime_ns)
+            for p in sources
+        ]
+        self.routes = {}
+        self.dirty = False
+        if os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    fingerprint, routes = pickle.load(f)
+                if fingerprint == self.fingerprint:
+                    self.routes = routes
+            except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+                pass
+
+    def get(self, key):
+        return self.routes.get(key)
+
+    def put(self, key, legs):
+        self.routes[key] = legs
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = "{}.{}.tmp".format(self.path, os.getpid())
+        with open(tmp_path, "wb") as f:
+            pickle.dump(
+                (self.fingerprint, self.routes), f, protocol=pickle.HIGHEST_PROTOCOL
+            )
+        os.replace(tmp_path, self.path)
+        self.dirty = False
 
 
 def calculate_cost_taxi(distance):
@@ -166,24 +384,114 @@ class Transportation:
 
         curdir = os.path.dirname(os.path.realpath(__file__))
         SUBWAY_PATH = os.path.join(curdir, base_path + "subways.json")
-        self.city_stations_dict = {}
-        self.city_lines_dict = {}
-        self.city_station_to_line = {}
-        for city in self.city_list:
-            stations_all, metro_lines, station_to_line = get_lines_and_stations(
-                city, SUBWAY_PATH
+        db = SandboxDatabase.get_instance()
+
+        def derive(name, func):
+            return lambda city: db.derive(
+                SUBWAY_PATH, read_json, (name, city), lambda _: func(city)
             )
-            self.city_stations_dict[city] = stations_all
-            self.city_lines_dict[city] = metro_lines
-            self.city_station_to_line[city] = station_to_line
 
-        self.graphs = {}
-        for city in self.city_list:
-            self.graphs[city] = build_graph(self.city_lines_dict[city])
+        lines = derive(
+            "lines", lambda city: get_lines_and_stations(city, SUBWAY_PATH)
+        )
+        self.city_stations_dict = db.tables(self.city_list, lambda c: lines(c)[0])
+        self.city_lines_dict = db.tables(self.city_list, lambda c: lines(c)[1])
+        self.city_station_to_line = db.tables(self.city_list, lambda c: lines(c)[2])
+
+        self.graphs = db.tables(
+            self.city_list, derive("graph", lambda city: build_graph(lines(city)[1]))
+        )
+        self.metro_networks = LazyTables(
+            self.city_list,
+            derive(
+                "network", lambda city: MetroNetwork(lines(city)[1], lines(city)[0])
+            ),
+        )
+        self.station_index = LazyTables(
+            self.city_list,
+            derive("station_index", lambda city: build_station_index(lines(city)[0])),
+        )
 
         self.poi_search = Poi()
 
+        def poi_nearest_station(city):
+            city_cn = self.city_list_chinese[self.city_list.index(city)]
+            poi_path = self.poi_search.data_path_map[city_cn]
+            reader = NearestStationReader(city, SUBWAY_PATH)
+            return db.derive(
+                poi_path,
+                reader,
+                "lookup",
+                lambda table: dict(
+                    zip(
+                        table["name"],
+                        zip(table["station"].tolist(), table["distance"].tolist()),
+                    )
+                ),
+            )
+
+        self.poi_nearest_station = LazyTables(self.city_list, poi_nearest_station)
+
+        def route_cache(city):
+            city_cn = self.city_list_chinese[self.city_list.index(city)]
+            sources = [self.poi_search.data_path_map[city_cn], SUBWAY_PATH]
+            path = os.path.join(db.root, ".routes", city + ".pkl")
+            return db.derive(
+                SUBWAY_PATH,
+                read_json,
+                ("routes", city),
+                lambda _: RouteCache(path, sources),
+            )
+
+        self.route_cache = LazyTables(self.city_list, route_cache)
+
+    def nearest_station(self, city, name, location):
+        """
+        Nearest metro station of a location and the distance to it, read from
+        the precomputed POI table when `name` is a POI of the city.
+        """
+        stations = self.city_stations_dict[city]
+        if not isinstance(location, tuple):
+            return find_nearest_station(location, stations)
+        station, distance = self.poi_nearest_station[city].get(name, (None, None))
+        if station is None:
+            station, distance = find_nearest_station_indexed(
+                location, self.station_index[city]
+            )
+        if station is None or station < 0:
+            return None, float("inf")
+        return stations[station], distance
+
+    def save_route_cache(self):
+        db = SandboxDatabase.get_instance()
+        for cache in db.find_derived(
+            lambda name: isinstance(name, tuple) and name[0] == "routes"
+        ):
+            try:
+                cache.save()
+            except OSError:
+                pass
+
     def goto(self, city, start, end, start_time, transport_type, verbose=False):
+        if transport_type not in ["walk", "metro", "taxi"]:
+            return "only support transport_type in ['walk','metro','taxi']"
+        if verbose:
+            return self._goto(city, start, end, start_time, transport_type, verbose)
+        city_en = city
+        if city in self.city_list_chinese:
+            city_en = self.city_list[self.city_list_chinese.index(city)]
+        routes = self.route_cache.get(city_en)
+        if routes is None or not (isinstance(start, str) and isinstance(end, str)):
+            return self._goto(city, start, end, start_time, transport_type)
+        key = (start, end, transport_type)
+        legs = routes.get(key)
+        if legs is None:
+            transports = self._goto(city, start, end, start_time, transport_type)
+            routes.put(key, route_legs(transports))
+            return transports
+        return replay_legs(legs, start_time)
+
+    def _goto(self, city, start, end, start_time, transport_type, verbose=False):
         if transport_type not in ["walk", "metro", "taxi"]:
             return "only support transport_type in ['walk','metro','taxi']"
         locationA = start
@@ -197,7 +505,8 @@ class Transportation:
         locationA, locationB = coordinate_A, coordinate_B
         transports = []
         if transport_type == "walk":
-            distance = geodesic(locationA, locationB).kilometers
+            # reported unrounded, so as geopy computes it
+            distance = geo_distance(locationA, locationB, mode="exact")
             walking_speed = 5.0
             time = distance / walking_speed
             cost = 0.0
@@ -221,7 +530,7 @@ class Transportation:
             return transports
 
         elif transport_type == "taxi":
-            distance = geodesic(locationA, locationB).kilometers
+            distance = geo_distance(locationA, locationB)
             taxi_speed = 40.0
             time = distance / taxi_speed
             cost = calculate_cost_taxi(distance)
@@ -245,13 +554,8 @@ class Transportation:
             return transports
 
         elif transport_type == "metro":
-            graph = self.graphs[city]
-            stationA, distanceA = find_nearest_station(
-                locationA, self.city_stations_dict[city]
-            )
-            stationB, distanceB = find_nearest_station(
-                locationB, self.city_stations_dict[city]
-            )
+            stationA, distanceA = self.nearest_station(city, locationA_name, locationA)
+            stationB, distanceB = self.nearest_station(city, locationB_name, locationB)
             if stationA == stationB:
                 if verbose:
                     print("Too near. Walk.")
@@ -264,13 +568,10 @@ class Transportation:
                     transport_type="walk",
                     verbose=verbose,
                 )
-            shortest_path = find_shortest_path(
-                graph, stationA["name"], stationB["name"]
-            )
             if stationA and stationB:
-                distance_between_stations = geodesic(
+                distance_between_stations = geo_distance(
                     stationA["position"], stationB["position"]
-                ).kilometers
+                )
                 subway_speed = 30.0
                 time_between_stations = distance_between_stations / subway_speed
                 walking_speed = 5.0
@@ -317,6 +618,10 @@ class Transportation:
                     }
                 )
                 if verbose:
+                    route = self.metro_networks[city].route(
+                        stationA["name"], stationB["name"]
+                    )
+                    shortest_path = route["stations"] if route else []
                     print(
                         "Walk: From starting point to metro {}, Distance: {}.".format(
                             stationA["name"] + "-地铁站", distanceA
@@ -325,6 +630,12 @@ class Transportation:
                     print(
                         f"Subway: From {stationA['name'] + '-地铁站'} to {stationB['name'] + '-地铁站'}: {' -> '.join(shortest_path)}"
                     )
+                    if route:
+                        print(
+                            "Lines: {}, {} transfer(s)".format(
+                                " -> ".join(route["lines"]), route["transfers"]
+                            )
+                        )
                     print("The cost of subway: {}¥".format(cost))
                     print(
                         "Walk: From metro {} to ending point,  Distance: {}.".format(
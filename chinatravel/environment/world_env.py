@@ -1,10 +1,34 @@
 import os
 import sys
+import ast
+import builtins
+from collections import deque
+from functools import lru_cache, partial
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 sys.path.append("../..")
 from environment.tools import *
-from pandas import DataFrame
+from chinatravel.environment.sandbox_db import SandboxDatabase, is_read_only, read_only
+from chinatravel.environment.call_cache import (
+    CallCache,
+    Uncacheable,
+    call_key,
+    normalize,
+)
+from chinatravel.environment.predicates import (
+    eq,
+    ne,
+    lt,
+    le,
+    gt,
+    ge,
+    between,
+    isin,
+    contains,
+    open_at,
+    where,
+)
+from pandas import DataFrame, RangeIndex
 from typing import Any
 
 
@@ -12,14 +36,37 @@ class EnvOutput:
     class KeyError(Exception):
         pass
 
+    PAGE_SIZE = 10
+
     def __init__(self, success: bool, data: Any):
         self._success = success
         self._data = data
         if isinstance(data, DataFrame):
             self._page_idx = 0
-            self._page_total = len(data) // 10 + (1 if len(data) % 10 != 0 else 0)
+            self._page_total = -(-len(data) // self.PAGE_SIZE)
             self._original_data = data
-            self._data = data.head(10)
+            self._data = self.page(0)
+
+    def page(self, idx: int) -> DataFrame:
+        """Rows of page `idx` (from 0), a view of the result."""
+        start = idx * self.PAGE_SIZE
+        return self._original_data.iloc[start : start + self.PAGE_SIZE]
+
+    def pages(self):
+        """Cursor over the pages after the current one, without moving it."""
+        for idx in range(self._page_idx + 1, self._page_total):
+            yield self.page(idx)
+
+    def all_pages(self):
+        """
+        All rows of a DataFrame result, numbered from 0 like the pages of
+        `next_page()` concatenated, in one call: a read-only view, as the
+        data is not copied. Other results are returned as they are.
+        """
+        if not hasattr(self, "_original_data"):
+            return self._data
+        data = self._original_data
+        return read_only(data.set_axis(RangeIndex(len(data)), axis=0, copy=False))
 
     def __getitem__(self, key):
         if key == "success":
@@ -36,6 +83,20 @@ class EnvOutput:
             f"Invalid key: {key},only support 'success', 'data', 'whole_data' and 'str'."
         )
 
+    def nbytes(self) -> int:
+        """
+        Memory held by the result alone. A DataFrame it owns counts deeply,
+        index and strings included; a read-only view, such as `select(city)`
+        returns, counts 0, as its arrays belong to the shared tables (or to
+        the call cache) and outlive the result. Other data counts shallowly.
+        """
+        if hasattr(self, "_original_data"):
+            data = self._original_data
+            if is_read_only(data):
+                return 0
+            return int(data.memory_usage(index=True, deep=True).sum())
+        return sys.getsizeof(self._data)
+
     def to_dict(self):
         return {
             "success": self._success,
@@ -52,10 +113,8 @@ class EnvOutput:
                 return "No data."
             header_str = self._data.columns.values
             res = str(header_str) + "\n"
-            for i in range(10):
-                if i >= len(self._data):
-                    break
-                res += str(self._data.iloc[i].values) + "\n"
+            for row in self._data.values[: self.PAGE_SIZE]:
+                res += str(row) + "\n"
             res += (
                 "Page/Total: " + str(self._page_idx + 1) + "/" + str(self._page_total)
             )
@@ -74,21 +133,169 @@ class EnvOutput:
             self._data = "No more data."
 
         self._page_idx += 1
-        self._data = self._original_data.iloc[
-            self._page_idx * 10 : (self._page_idx + 1) * 10
-        ]
+        self._data = self.page(self._page_idx)
         return self
 
 
+class ResultHistory:
+    """
+    The results of a WorldEnv, keeping only the last `maxlen` of them
+    (all of them if `maxlen` is None). Indices stay those of the full
+    history: `Results[3]` is the fourth result even after older ones were
+    dropped, and asking for a dropped one raises IndexError.
+    """
+
+    def __init__(self, maxlen=None):
+        self.maxlen = maxlen
+        self._items = deque(maxlen=maxlen)
+        self._sizes = deque(maxlen=maxlen)
+        self.dropped = 0
+        self.bytes = 0
+        self.peak_bytes = 0
+
+    def append(self, res: EnvOutput):
+        if len(self._items) == self.maxlen:
+            self.bytes -= self._sizes[0]
+            self.dropped += 1
+        size = res.nbytes()
+        self._items.append(res)
+        self._sizes.append(size)
+        self.bytes += size
+        self.peak_bytes = max(self.peak_bytes, self.bytes)
+
+    def clear(self):
+        self._items.clear()
+        self._sizes.clear()
+        self.dropped = 0
+        self.bytes = 0
+
+    def __len__(self):
+        return self.dropped + len(self._items)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [
+                self._items[i - self.dropped]
+                for i in range(*idx.indices(len(self)))
+                if i >= self.dropped
+            ]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("result index out of range")
+        if idx < self.dropped:
+            raise IndexError(
+                "result {} was dropped, only the last {} results are kept".format(
+                    idx, self.maxlen
+                )
+            )
+        return self._items[idx - self.dropped]
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def stats(self):
+        """Result counts and the memory held by the kept results."""
+        return {
+            "total": len(self),
+            "kept": len(self._items),
+            "dropped": self.dropped,
+            "bytes": self.bytes,
+            "peak_bytes": self.peak_bytes,
+        }
+
+
+# names whose value changes between commands
+_STATEFUL_NAMES = {"Results", "self", "next_page"}
+
+
+def _arg_key(node):
+    try:
+        value = ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError):
+        pass
+    else:
+        return normalize(value)
+    for child in ast.walk(node):
+        if isinstance(child, ast.Name) and child.id in _STATEFUL_NAMES:
+            raise ValueError(child.id)
+    # lambdas and predicates by their source text
+    return ("expr", ast.dump(node))
+
+
+def _command_key(tree):
+    """The `call_key` of a command `tool(args...)`, None if not cacheable."""
+    call = tree.body
+    if not isinstance(call, ast.Call) or not isinstance(call.func, ast.Name):
+        return None
+    if any(isinstance(arg, ast.Starred) for arg in call.args) or any(
+        kw.arg is None for kw in call.keywords
+    ):
+        return None
+    try:
+        args = ("tuple",) + tuple(_arg_key(arg) for arg in call.args)
+        kwargs = ("dict",) + tuple(
+            sorted((kw.arg, _arg_key(kw.value)) for kw in call.keywords)
+        )
+    except (ValueError, TypeError, Uncacheable):
+        return None
+    return (call.func.id, args, kwargs)
+
+
+@lru_cache(maxsize=4096)
+def _compile(cmd_str: str):
+    # eval() also ignores leading blanks
+    tree = ast.parse(cmd_str.lstrip(" \t"), filename="<string>", mode="eval")
+    func = tree.body.func if isinstance(tree.body, ast.Call) else None
+    return (
+        compile(tree, "<string>", "eval"),
+        getattr(func, "id", None),
+        _command_key(tree),
+    )
+
+
+def compile_command(cmd_str: str, namespace: dict):
+    """
+    Parse a command once (cached by string) and check that a called
+    function name is an API function or otherwise defined.
+    """
+    code, func_name, _ = _compile(cmd_str)
+    if (
+        func_name is not None
+        and func_name not in namespace
+        and func_name not in globals()
+        and not hasattr(builtins, func_name)
+    ):
+        raise NameError("name '{}' is not defined".format(func_name))
+    return code
+
+
 class WorldEnv:
     """
     World Environment
     Provide APIs to access the virtual world.
     """
 
-    def __init__(self, en_version=False):
+    # results kept for `Results[...]` and `next_page()` by default
+    MAX_RESULTS = 256
+    # entries of the tool-call cache by default
+    CACHE_SIZE = 1024
+
+    def __init__(
+        self,
+        en_version=False,
+        lazy=None,
+        max_results=None,
+        cache_size=None,
+        cache_ttl=None,
+    ):
         """
         Initialize the world environment.
+        `max_results` (default CHINATRAVEL_MAX_RESULTS or MAX_RESULTS) bounds
+        the result history; 0 or less keeps every result.
+        `cache_size` (default CHINATRAVEL_CALL_CACHE or CACHE_SIZE) bounds the
+        tool-call cache, 0 disables it; `cache_ttl` (CHINATRAVEL_CALL_CACHE_TTL)
+        expires its entries after that many seconds.
         """
 
         self.support_cities = [
@@ -103,6 +310,8 @@ class WorldEnv:
             "武汉",
             "南京",
         ]
+        if lazy is not None:
+            SandboxDatabase.get_instance().configure(lazy=lazy)
         self.attractions = Attractions()
         self.accommodations = Accommodations()
         self.restaurants = Restaurants()
@@ -110,61 +319,134 @@ class WorldEnv:
         self.transportation = Transportation()
         self.poi = Poi()
 
-        self.results = []
+        if max_results is None:
+            max_results = int(
+                os.environ.get("CHINATRAVEL_MAX_RESULTS", self.MAX_RESULTS)
+            )
+        self.results = ResultHistory(max_results if max_results > 0 else None)
+        if cache_size is None:
+            cache_size = int(os.environ.get("CHINATRAVEL_CALL_CACHE", self.CACHE_SIZE))
+        if cache_ttl is None and os.environ.get("CHINATRAVEL_CALL_CACHE_TTL"):
+            cache_ttl = float(os.environ["CHINATRAVEL_CALL_CACHE_TTL"])
+        self.cache = CallCache(cache_size, cache_ttl) if cache_size > 0 else None
+        self.bind_tools()
+
+    def bind_tools(self):
+        """
+        (Re)build the registry of API functions, e.g. after replacing a tool.
+        """
+        self.tools = {
+            "attractions_keys": self.attractions.keys,
+            "attractions_types": self.attractions.get_type_list,
+            "attractions_select": self.attractions.select,
+            "attractions_id_is_open": self.attractions.id_is_open,
+            "attractions_ids_are_open": self.attractions.ids_are_open,
+            "attractions_nearby": self.attractions.nearby,
+            "accommodations_keys": self.accommodations.keys,
+            "accommodations_select": self.accommodations.select,
+            "accommodations_nearby": self.accommodations.nearby,
+            "restaurants_select": self.restaurants.select,
+            "restaurants_keys": self.restaurants.keys,
+            "restaurants_nearby": self.restaurants.nearby,
+            "restaurants_id_is_open": self.restaurants.id_is_open,
+            "restaurants_ids_are_open": self.restaurants.ids_are_open,
+            "restaurants_cuisine": self.restaurants.get_cuisine_list,
+            "restaurants_with_recommended_food": (
+                self.restaurants.restaurants_with_recommended_food
+            ),
+            "goto": self.transportation.goto,
+            "intercity_transport_select": self.intercitytransport.select,
+            "poi_lat_lon_search": self.poi.search,
+            "next_page": self.next_page,
+        }
+        self._namespace = dict(self.tools, self=self)
+        if self.cache is not None:
+            self.cache.clear()
+
+    def _cached(self, key, func):
+        """`func()`, answered from the tool-call cache when `key` is set."""
+        if (
+            key is None
+            or self.cache is None
+            or key[0] not in self.tools
+            or key[0] == "next_page"
+        ):
+            return func()
+        hit, res = self.cache.get(key)
+        if not hit:
+            res = func()
+            if not isinstance(res, EnvOutput):
+                self.cache.put(key, res)
+        return res
 
     def __call__(self, cmd_str: str):
         """
         Call the API by command string in the format of python function call.
         """
-        # init env to execute the command directly
-        attractions_keys = self.attractions.keys
-        attractions_types = self.attractions.get_type_list
-        attractions_select = self.attractions.select
-        attractions_id_is_open = self.attractions.id_is_open
-        attractions_nearby = self.attractions.nearby
-
-        accommodations_keys = self.accommodations.keys
-        accommodations_select = self.accommodations.select
-        accommodations_nearby = self.accommodations.nearby
-
-        restaurants_select = self.restaurants.select
-        restaurants_keys = self.restaurants.keys
-        restaurants_nearby = self.restaurants.nearby
-        restaurants_id_is_open = self.restaurants.id_is_open
-        restaurants_cuisine = self.restaurants.get_cuisine_list
-        restaurants_with_recommended_food = (
-            self.restaurants.restaurants_with_recommended_food
-        )
-
-        goto = self.transportation.goto
-        intercity_transport_select = self.intercitytransport.select
-        poi_lat_lon_search = self.poi.search
-
-        next_page = self.next_page
-        Results = self.results
+        return self._execute(cmd_str, self.results)
 
+    def call(self, name: str, *args, **kwargs):
+        """
+        Call an API function by name, e.g. `env.call("goto", city, start, end,
+        start_time, "metro")`: the same result as `env("goto(...)")` without
+        formatting and parsing a command string.
+        """
+        return self._dispatch(name, args, kwargs, self.results)
+
+    def _execute(self, cmd_str: str, results: ResultHistory):
+        # `Results` and `next_page` refer to the history the command is run for
+        namespace = dict(
+            self._namespace,
+            Results=results,
+            next_page=partial(self._next_page, results),
+        )
         try:
-            res = eval(cmd_str)
+            code = compile_command(cmd_str, namespace)
+            res = self._cached(
+                _compile(cmd_str)[2], lambda: eval(code, globals(), namespace)
+            )
             if not isinstance(res, EnvOutput):
                 res = EnvOutput(True, res)
         except Exception as e:
             res = EnvOutput(False, "Invalid command.\n" + str(e))
-        self.results.append(res)
-        return self.results[-1]
+        results.append(res)
+        return res
+
+    def _dispatch(self, name: str, args, kwargs, results: ResultHistory):
+        if name == "next_page":
+            func = partial(self._next_page, results)
+        else:
+            func = self.tools.get(name)
+        try:
+            if func is None:
+                raise NameError("name '{}' is not defined".format(name))
+            res = self._cached(
+                call_key(name, args, kwargs), lambda: func(*args, **kwargs)
+            )
+            if not isinstance(res, EnvOutput):
+                res = EnvOutput(True, res)
+        except Exception as e:
+            res = EnvOutput(False, "Invalid command.\n" + str(e))
+        results.append(res)
+        return res
 
     def next_page(self):
         """
         Go to the next page.
         """
-        if len(self.results) == 0:
+        return self._next_page(self.results)
+
+    @staticmethod
+    def _next_page(results: ResultHistory):
+        if len(results) == 0:
             return "No results."
-        return self.results[-1].next_page()
+        return results[-1].next_page()
 
     def reset(self):
         """
         Reset the environment.
         """
-        self.results = []
+        self.results.clear()
 
 
 __doc__ = """
@@ -267,16 +549,33 @@ end: The end point's name. Must be a location name and match the data exactly.
 start_time: The departure time in the format 'HH:MM'.
 transport_type: The mode of transportation, must in ['walk', 'taxi', 'metro'].
 
-(16) intercity_transport_select(start_city: str, end_city: str, intercity_type: str, earliest_leave_time: str = None):
+(16) intercity_transport_select(start_city: str, end_city: str, intercity_type: str, earliest_leave_time: str = None, latest_leave_time: str = None, arrive_by: str = None, max_cost: float = None):
 Description: get the intercity transportation information between two cities. You need to call this function at least twice to get the transportation information between two locations for going and returning.
 Parameters:
 start_city: The start city name.
 end_city: The end city name.
 intercity_type: The type of intercity transportation, must in ['train', 'airplane'].
 earliest_leave_time: The earliest leave time in the format 'HH:MM'.
+latest_leave_time: The latest leave time in the format 'HH:MM'.
+arrive_by: The latest arrival time on the day of departure, in the format 'HH:MM'.
+max_cost: The highest ticket price.
 
 (17) Results[index] Results[index].next_page()
-Description: Get the result of the index or go to the next page of the result.
+Description: Get the result of the index or go to the next page of the result. Only the latest results are kept (256 by default).
+
+(18) Predicates for attractions_select, accommodations_select and restaurants_select:
+eq(v), ne(v), lt(v), le(v), gt(v), ge(v), between(low, high), isin([v, ...]), contains(sub), open_at('HH:MM')
+Description: Vectorized filters that can be passed instead of the lambda function, combined with &, | and ~.
+Examples:
+attractions_select('上海', 'price', le(50))
+attractions_select('上海', {'type': isin(['公园', '博物馆']), 'price': le(50)})
+restaurants_select('上海', open_at('12:00') & le(100, key='price'))
+restaurants_select('上海')  # all rows
+
+(19) attractions_ids_are_open(city: str, ids: list, time: str), restaurants_ids_are_open(city: str, ids: list, time: str):
+Description: attractions_id_is_open / restaurants_id_is_open for many IDs at once, returns one boolean per ID. time is one 'HH:MM' for all IDs or a list with one time per ID.
+Example:
+restaurants_ids_are_open('上海', [0, 1, 2], '12:00')
 """
 
 
@@ -14,7 +14,6 @@ import sys
 from tqdm import tqdm
 
     
-import pandas as pd
 
 # accommodation = Accommodations()
 # restaurants = Restaurants()
@@ -22,7 +21,9 @@ import pandas as pd
 # intercity_transport=IntercityTransport()
 # innercity_transport=Transportation()
 
-from chinatravel.symbol_verification.commonsense_constraint import Is_intercity_transport_correct, Is_attractions_correct, Is_hotels_correct, Is_restaurants_correct, Is_transport_correct, Is_time_correct, Is_space_correct
+from chinatravel.symbol_verification.commonsense_constraint import Is_intercity_transport_correct, Is_attractions_correct, Is_hotels_correct, Is_restaurants_correct, Is_transport_correct, Is_time_correct, Is_space_correct, COMMONSENSE_COLUMNS
+from chinatravel.symbol_verification.check_result import CheckTable
+from chinatravel.symbol_verification.plan_features import PlanFeatures
 
 '''
 Constraints:
@@ -48,8 +49,8 @@ def evaluate_commonsense_constraints(data_index, symbolic_input_dict, plan_json_
     results_per_sample=[]
 
 
-    result_agg = pd.DataFrame(columns=['data_id'])
-    result_agg['data_id'] = data_index
+    # one row of flags per query, the DataFrame is built once at the end
+    result_table = CheckTable(data_index, COMMONSENSE_COLUMNS)
 
     individual_succ = 0
     pass_id = []
@@ -65,21 +66,18 @@ def evaluate_commonsense_constraints(data_index, symbolic_input_dict, plan_json_
             print(symbolic_input)
             print(plan_json)
         try:
+            features = PlanFeatures(plan_json, symbolic_input.get("target_city"))
             for func in func_list:
 
-                table_res, error_info = func(symbolic_input, plan_json, verbose=verbose)
+                table_res, error_info = func(symbolic_input, plan_json, verbose=verbose, features=features)
                 
                 if verbose:
                     print(error_info)
                 
-                for colum_i in table_res.columns:
-                    if colum_i not in result_agg.columns:
-                        result_agg[colum_i] = 0
-
-                    result_agg.loc[ii, colum_i] = table_res[colum_i].loc[0]
+                result_table.put(ii, table_res)
 
                 # print(info)
-            if result_agg.loc[ii][1:].sum() == 0:
+            if result_table.row_sum(ii) == 0:
                 individual_succ += 1
                 pass_id.append(idx)
         except Exception as message:
@@ -90,6 +88,7 @@ def evaluate_commonsense_constraints(data_index, symbolic_input_dict, plan_json_
         
                             
 
+    result_agg = result_table.to_frame()
     total_count=len(data_index)
     micro_accuracy = 1. - result_agg.drop("data_id", axis=1).sum().sum() / (total_count * (result_agg.shape[1] - 1))
     
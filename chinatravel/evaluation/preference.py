@@ -11,9 +11,11 @@ if project_root_path not in sys.path:
 
 import json
 from chinatravel.environment.world_env import WorldEnv
+from chinatravel.environment.timeutil import minutes_between
 from chinatravel.evaluation.utils import Attractions
 
 from chinatravel.symbol_verification.preference import evaluate_preference_py
+from chinatravel.symbol_verification.plan_features import PlanFeatures
 env = WorldEnv()
 attractions = Attractions()
 goto = env.transportation.goto
@@ -33,46 +35,54 @@ city_dict = {
 
 
 def calc_time_delta(st_time, ed_time):
-    st_h, st_m = int(st_time.split(":")[0]), int(st_time.split(":")[1])
-    ed_h, ed_m = int(ed_time.split(":")[0]), int(ed_time.split(":")[1])
-    return (ed_m - st_m) + (ed_h - st_h) * 60
+    return minutes_between(st_time, ed_time)
 
 
-def convenient_transport(plan_json):
+def _features(plan_json, features):
+    # one walk over the plan shared by the metrics, see plan_features.py
+    if features is None:
+        features = PlanFeatures(plan_json)
+    return features
+
+
+def convenient_transport(plan_json, features=None):
+    features = _features(plan_json, features)
     plan = plan_json["itinerary"]
     time_cost = 0
     transport_count = 0
-    for plan_of_day in plan:
-        for activity in plan_of_day["activities"]:
-            if "transports" in activity:
-                transport_count += 1
-                for transport in activity["transports"]:
-                    time_cost += calc_time_delta(
-                        transport["start_time"], transport["end_time"]
-                    )
+    for act in features.activities:
+        activity = act.activity
+        if "transports" in activity:
+            transport_count += 1
+            for transport in activity["transports"]:
+                time_cost += calc_time_delta(
+                    transport["start_time"], transport["end_time"]
+                )
     average_time_cost = time_cost / transport_count
     return average_time_cost
 
 
-def convenient_restaurant(plan_json):
+def convenient_restaurant(plan_json, features=None):
+    features = _features(plan_json, features)
     plan = plan_json["itinerary"]
     restaurant_count = 0
     time_cost = 0
-    for plan_of_day in plan:
-        for activity in plan_of_day["activities"]:
-            if activity["type"] in ["breakfast", "lunch", "dinner"]:
-                restaurant_count += 1
-                for transport in activity["transports"]:
-                    time_cost += calc_time_delta(
-                        transport["start_time"], transport["end_time"]
-                    )
+    for act in features.activities:
+        activity = act.activity
+        if activity["type"] in ["breakfast", "lunch", "dinner"]:
+            restaurant_count += 1
+            for transport in activity["transports"]:
+                time_cost += calc_time_delta(
+                    transport["start_time"], transport["end_time"]
+                )
     if restaurant_count == 0:
         return -1
     average_time_cost = time_cost / restaurant_count
     return average_time_cost
 
 
-def near_poi(plan_json, poi_list):
+def near_poi(plan_json, poi_list, features=None):
+    features = _features(plan_json, features)
     poi_count = len(poi_list)
     if poi_count == 0:
         return -1
@@ -81,11 +91,15 @@ def near_poi(plan_json, poi_list):
         return -1
     city = plan_json["target_city"]
     accommodation_name = ""
-    for plan_of_day in plan:
-        for activity in plan_of_day["activities"]:
-            if activity["type"] == "accommodation":
-                accommodation_name = activity["position"]
-                break
+    accommodation_day = None
+    for act in features.activities:
+        activity = act.activity
+        # the first accommodation of each day, the last such day wins
+        if act.day == accommodation_day:
+            continue
+        if activity["type"] == "accommodation":
+            accommodation_name = activity["position"]
+            accommodation_day = act.day
     dist_cost = 0
     for poi in poi_list:
         # print("city", city, "accommodation_name", accommodation_name, "poi", poi)
@@ -96,63 +110,69 @@ def near_poi(plan_json, poi_list):
     return average_dist_cost
 
 
-def less_walk(plan_json):
+def less_walk(plan_json, features=None):
+    features = _features(plan_json, features)
     plan = plan_json["itinerary"]
     walk_distance = 0
     activity_count = 0
-    for plan_of_day in plan:
-        for activity in plan_of_day["activities"]:
-            if "transports" in activity:
-                for transport in activity["transports"]:
-                    if transport["mode"] == "walk":
-                        walk_distance += transport["distance"]
-                activity_count += 1
+    for act in features.activities:
+        activity = act.activity
+        if "transports" in activity:
+            for transport in activity["transports"]:
+                if transport["mode"] == "walk":
+                    walk_distance += transport["distance"]
+            activity_count += 1
     # average_walk_distance = walk_distance / activity_count
     return walk_distance
 
 
-def meal_cost_ratio(plan_json):
+def meal_cost_ratio(plan_json, features=None):
+    features = _features(plan_json, features)
     plan = plan_json["itinerary"]
     meal_cost = 0
-    for plan_of_day in plan:
-        for activity in plan_of_day["activities"]:
-            if activity["type"] in ["breakfast", "lunch", "dinner"]:
-                meal_cost += activity["cost"]
-    return meal_cost / total_cost(plan_json)
+    for act in features.activities:
+        activity = act.activity
+        if activity["type"] in ["breakfast", "lunch", "dinner"]:
+            meal_cost += activity["cost"]
+    return meal_cost / total_cost(plan_json, features)
 
 
-def accommodation_cost_ratio(plan_json):
+def accommodation_cost_ratio(plan_json, features=None):
+    features = _features(plan_json, features)
     plan = plan_json["itinerary"]
     accommodation_cost = 0
-    for plan_of_day in plan:
-        for activity in plan_of_day["activities"]:
-            if activity["type"] == "accommodation":
-                accommodation_cost += activity["cost"]
-    return accommodation_cost / total_cost(plan_json)
+    for act in features.activities:
+        activity = act.activity
+        if activity["type"] == "accommodation":
+            accommodation_cost += activity["cost"]
+    return accommodation_cost / total_cost(plan_json, features)
 
 
-def attraction_cost_ratio(plan_json):
+def attraction_cost_ratio(plan_json, features=None):
+    features = _features(plan_json, features)
     plan = plan_json["itinerary"]
     attraction_cost = 0
-    for plan_of_day in plan:
-        for activity in plan_of_day["activities"]:
-            if activity["type"] == "attraction":
-                attraction_cost += activity["cost"]
-    return attraction_cost / total_cost(plan_json)
+    for act in features.activities:
+        activity = act.activity
+        if activity["type"] == "attraction":
+            attraction_cost += activity["cost"]
+    return attraction_cost / total_cost(plan_json, features)
 
 
-def total_cost(plan_json):
+def total_cost(plan_json, features=None):
+    features = _features(plan_json, features)
     plan = plan_json["itinerary"]
     _total_cost = 0
-    for plan_of_day in plan:
-        for activity in plan_of_day["activities"]:
-            _total_cost += activity["cost"]
-            for transport in activity["transports"]:
-                _total_cost += transport["cost"]
+    for act in features.activities:
+        activity = act.activity
+        _total_cost += activity["cost"]
+        for transport in activity["transports"]:
+            _total_cost += transport["cost"]
     return _total_cost
 
 
-def attraction_satisfaction(plan_json):
+def attraction_satisfaction(plan_json, features=None):
+    features = _features(plan_json, features)
     plan = plan_json["itinerary"]
     city = plan_json["target_city"]
     recommend_time_list = []
@@ -164,20 +184,20 @@ def attraction_satisfaction(plan_json):
     # datapath=os.path.dirname(__file__) + "/eval_annotation/attractions/{}/attractions_tag.csv".format(city_dict[city])
     # ood_attractions_dataframe = pd.read_csv(datapath)
 
-    for plan_of_day in plan:
-        for activity in plan_of_day["activities"]:
-            if activity["type"] == "attraction":
-                attraction_name = activity["position"]
-                attrction_info = attractions.select(
-                    city, key="name", func=lambda x: x == attraction_name
-                ).iloc[0]
-                # attrction_info = ood_attractions_dataframe[ood_attractions_dataframe["name"] == attraction_name].iloc[0]
-                recommend_time = (attrction_info["recommendmintime"]) * 60
-                actual_time = calc_time_delta(
-                    activity["start_time"], activity["end_time"]
-                )
-                recommend_time_list.append(recommend_time)
-                actual_time_list.append(actual_time)
+    for act in features.activities:
+        activity = act.activity
+        if activity["type"] == "attraction":
+            attraction_name = activity["position"]
+            attrction_info = features.lookup(
+                "attraction", attraction_name, city
+            ).iloc[0]
+            # attrction_info = ood_attractions_dataframe[ood_attractions_dataframe["name"] == attraction_name].iloc[0]
+            recommend_time = (attrction_info["recommendmintime"]) * 60
+            actual_time = calc_time_delta(
+                activity["start_time"], activity["end_time"]
+            )
+            recommend_time_list.append(recommend_time)
+            actual_time_list.append(actual_time)
     if len(recommend_time_list) == 0:
         return -1
     # marco = sum(recommend_time_list) / sum(actual_time_list)
@@ -190,52 +210,55 @@ def attraction_satisfaction(plan_json):
     return micro
 
 
-def attraction_count(plan_json):
+def attraction_count(plan_json, features=None):
+    features = _features(plan_json, features)
     plan = plan_json["itinerary"]
     day_num = len(plan)
     attraction_count = 0
-    for plan_of_day in plan:
-        for activity in plan_of_day["activities"]:
-            if activity["type"] == "attraction":
-                attraction_count += 1
+    for act in features.activities:
+        activity = act.activity
+        if activity["type"] == "attraction":
+            attraction_count += 1
     average_attraction_count = attraction_count / day_num
     return average_attraction_count
 
 
-def indoor_attraction_ratio(plan_json):
+def indoor_attraction_ratio(plan_json, features=None):
+    features = _features(plan_json, features)
     plan = plan_json["itinerary"]
     attraction_count = 0
     indoor_attraction_count = 0
-    for plan_of_day in plan:
-        for activity in plan_of_day["activities"]:
-            if activity["type"] == "attraction":
-                attraction_count += 1
-                attraction_name = activity["position"]
-                city = plan_json["target_city"]
-                attraction_info = attractions.select(
-                    city, key="name", func=lambda x: x == attraction_name
-                ).iloc[0]
-                if attraction_info["indoor"] == 1:
-                    indoor_attraction_count += 1
+    for act in features.activities:
+        activity = act.activity
+        if activity["type"] == "attraction":
+            attraction_count += 1
+            attraction_name = activity["position"]
+            city = plan_json["target_city"]
+            attraction_info = features.lookup(
+                "attraction", attraction_name, city
+            ).iloc[0]
+            if attraction_info["indoor"] == 1:
+                indoor_attraction_count += 1
     if attraction_count == 0:
         return -1
     return indoor_attraction_count / attraction_count
 
 
-def popular_attraction_ratio(plan_json):
+def popular_attraction_ratio(plan_json, features=None):
+    features = _features(plan_json, features)
     plan = plan_json["itinerary"]
     attraction_count = 0
     popular_score_sum = 0
-    for plan_of_day in plan:
-        for activity in plan_of_day["activities"]:
-            if activity["type"] == "attraction":
-                attraction_count += 1
-                attraction_name = activity["position"]
-                city = plan_json["target_city"]
-                attraction_info = attractions.select(
-                    city, key="name", func=lambda x: x == attraction_name
-                ).iloc[0]
-                popular_score_sum += attraction_info["popularity"]
+    for act in features.activities:
+        activity = act.activity
+        if activity["type"] == "attraction":
+            attraction_count += 1
+            attraction_name = activity["position"]
+            city = plan_json["target_city"]
+            attraction_info = features.lookup(
+                "attraction", attraction_name, city
+            ).iloc[0]
+            popular_score_sum += attraction_info["popularity"]
     if attraction_count == 0:
         return -1
     return popular_score_sum / attraction_count
@@ -272,11 +295,12 @@ def _evaluate_preference(symbolic_input, plan_json):
         if poi_list_str != ""
         else []
     )
+    features = PlanFeatures(plan_json)
     for func in func_list:
         if func == near_poi:
-            result[func.__name__] = func(plan_json, poi_list)
+            result[func.__name__] = func(plan_json, poi_list, features)
         else:
-            result[func.__name__] = func(plan_json)
+            result[func.__name__] = func(plan_json, features)
     return result
 
 
@@ -14,6 +14,8 @@ if project_root_path not in sys.path:
 
 from chinatravel.agent.utils import Logger, NpEncoder
 from chinatravel.environment.tools import Attractions
+from chinatravel.environment.indexes import build_name_index
+from chinatravel.environment.spatial import SpatialIndex
 
 
 class AttractionsOODTag(Attractions):
@@ -57,6 +59,8 @@ class AttractionsOODTag(Attractions):
             self.data[city] = pd.merge(
                 self.data[city], self.ood_tag[city], on=["id", "name"], how="left"
             )
+            self.name_index[city] = build_name_index(self.data[city])
+            self.spatial_index[city] = SpatialIndex.from_table(self.data[city])
             # print(self.data[city])
         del self.ood_tag
 
@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+
+
+class _Row:
+    # `.iloc[0]` and `.loc[0]` of a record, for code written against the
+    # one-row DataFrames the checkers used to return
+    __slots__ = ("record",)
+
+    def __init__(self, record):
+        self.record = record
+
+    def __getitem__(self, key):
+        if key != 0:
+            raise IndexError(key)
+        return np.array(self.record.flags)
+
+
+class CheckResult:
+    """
+    The outcome of one commonsense check on a plan: a flag per entry of
+    `columns`, 1 where the plan breaks it and 0 where it passes.
+
+        res = CheckResult(("Unavailable attractions", "Repeated attraction Choices"))
+        res.fill([0, 0])
+        res.set("Repeated attraction Choices")
+        res.sum()  # 1
+
+    `set` takes one of `columns`, so every column a check may report is
+    declared up front; `to_frame()` gives the one-row DataFrame the checkers
+    used to build and `iloc[0]` its row as an array.
+    """
+
+    __slots__ = ("columns", "flags")
+
+    def __init__(self, columns, flags=None):
+        self.columns = tuple(columns)
+        self.flags = [0] * len(self.columns) if flags is None else list(flags)
+
+    def fill(self, flags):
+        """Set every flag, in the order of `columns`."""
+        if len(flags) != len(self.columns):
+            raise ValueError(
+                "Must have equal len keys and value when setting with an iterable"
+            )
+        self.flags = list(flags)
+
+    def set(self, column, flag=1):
+        try:
+            i = self.columns.index(column)
+        except ValueError:
+            raise KeyError(column) from None
+        self.flags[i] = flag
+
+    def sum(self):
+        return sum(self.flags)
+
+    @property
+    def iloc(self):
+        return _Row(self)
+
+    loc = iloc
+
+    def to_frame(self):
+        return pd.DataFrame([self.flags], columns=list(self.columns))
+
+    def __repr__(self):
+        return repr(self.to_frame())
+
+
+class CheckTable:
+    """
+    The flags of many queries, one row per query, in an array allocated
+    once for `data_index` and the `columns` the checks may report.
+
+        table = CheckTable(data_index, COMMONSENSE_COLUMNS)
+        table.put(row, result)  # for each CheckResult of the query
+        table.to_frame()  # data_id and the columns reported, in that order
+
+    Columns no check reported are left out of the frame, and a column not
+    in `columns` gets one on first report, as when the aggregate DataFrame
+    grew a column on first use.
+    """
+
+    def __init__(self, data_index, columns):
+        self.data_index = list(data_index)
+        self._position = {}
+        for column in columns:
+            self._position.setdefault(column, len(self._position))
+        self.flags = np.zeros(
+            (len(self.data_index), len(self._position)), dtype=np.int64
+        )
+        self._slots = {}
+        # columns in the order they were first reported
+        self._reported = []
+
+    def _slot(self, columns):
+        slot = self._slots.get(columns)
+        if slot is None:
+            for column in columns:
+                if column not in self._position:
+                    self._position[column] = len(self._position)
+                    self.flags = np.hstack(
+                        [self.flags, np.zeros((len(self.flags), 1), np.int64)]
+                    )
+            slot = self._slots[columns] = np.array(
+                [self._position[column] for column in columns], dtype=np.intp
+            )
+            for column in columns:
+                if column not in self._reported:
+                    self._reported.append(column)
+        return slot
+
+    def put(self, row, result):
+        slot = self._slot(result.columns)
+        self.flags[row, slot] = result.flags
+
+    def row_sum(self, row):
+        return self.flags[row].sum()
+
+    def to_frame(self):
+        positions = [self._position[column] for column in self._reported]
+        frame = pd.DataFrame(self.flags[:, positions], columns=self._reported)
+        frame.insert(0, "data_id", self.data_index)
+        return frame
@@ -1,6 +1,42 @@
+from functools import lru_cache
+
 from chinatravel.environment.tools.accommodations.apis import Accommodations
 from chinatravel.environment.tools.restaurants.apis import Restaurants
 from chinatravel.environment.tools.attractions.apis import Attractions
+from chinatravel.environment.timeutil import minutes_between
+# imported under private names, as the agents import this module with `*`
+from chinatravel.symbol_verification.tool_cache import (
+    hashable as _hashable,
+    shared_tool as _tool,
+)
+
+
+# The helpers below run for every activity of every plan, so they share the
+# tool instances of tool_cache and remember answers per (city, name).
+def _first_value(cls, city, name, key):
+    """`key` of the first row named `name` in the `cls` table of `city`."""
+    values = _tool(cls).get_by_name(city, name)[key]
+    if values.empty:
+        return _MISSING
+    return values.iloc[0]
+
+
+_cached_first_value = lru_cache(maxsize=65536)(_first_value)
+_MISSING = object()
+
+
+def _poi_field(cls, city, name, key):
+    # unhashable arguments are looked up without the cache; errors raised by
+    # the lookup itself propagate either way
+    if not _hashable(cls, city, name, key):
+        return _first_value(cls, city, name, key)
+    return _cached_first_value(cls, city, name, key)
+
+
+def clear_caches():
+    """Forget the cached lookups, e.g. after the database was reloaded."""
+    _cached_first_value.cache_clear()
+    _cached_goto_distance.cache_clear()
 
 
 def day_count(plan):
@@ -77,27 +113,34 @@ def activity_time(activity):
     end_time = activity.get("end_time")
 
     if start_time and end_time:
-        st_h, st_m = map(int, start_time.split(":"))
-        ed_h, ed_m = map(int, end_time.split(":"))
-        return (ed_m - st_m) + (ed_h - st_h) * 60
+        return minutes_between(start_time, end_time)
     else:
         return -1
 
 
 def poi_recommend_time(city, poi):
-    select = Attractions().select
-    attrction_info = select(city, key="name", func=lambda x: x == poi).iloc[0]
-    recommend_time = (attrction_info["recommendmintime"]) * 60
-    return recommend_time
+    recommend_time = _poi_field(Attractions, city, poi, "recommendmintime")
+    if recommend_time is _MISSING:
+        raise LookupError("no attraction named {!r} in {}".format(poi, city))
+    return recommend_time * 60
 
 
-def poi_distance(city, poi1, poi2, start_time="00:00", transport_type="walk"):
+def _goto_distance(city, poi1, poi2, start_time, transport_type):
     from chinatravel.environment.tools.transportation.apis import Transportation
 
-    goto = Transportation().goto
+    goto = _tool(Transportation).goto
     return goto(city, poi1, poi2, start_time, transport_type)[0]["distance"]
 
 
+_cached_goto_distance = lru_cache(maxsize=65536)(_goto_distance)
+
+
+def poi_distance(city, poi1, poi2, start_time="00:00", transport_type="walk"):
+    if not _hashable(city, poi1, poi2, start_time, transport_type):
+        return _goto_distance(city, poi1, poi2, start_time, transport_type)
+    return _cached_goto_distance(city, poi1, poi2, start_time, transport_type)
+
+
 def innercity_transport_cost(transports, node=None):
     """
     计算市内交通费用
@@ -139,15 +182,9 @@ def innercity_transport_distance(transports, mode=None):
 
 def innercity_transport_time(transports, mode=None):
 
-    def calc_time_delta(end_time, start_time):
-        hour1, minu1 = int(end_time.split(":")[0]), int(end_time.split(":")[1])
-        hour2, minu2 = int(start_time.split(":")[0]), int(start_time.split(":")[1])
-
-        return (hour1 - hour2) * 60 + (minu1 - minu2)
-    
     time_cost = 0
     for transport in transports:
-        time_cost += calc_time_delta(transport["end_time"], transport["start_time"])
+        time_cost += minutes_between(transport["start_time"], transport["end_time"])
     return time_cost
 
 def metro_tickets(transports):
@@ -170,38 +207,25 @@ def room_type(activity):
 
 
 def restaurant_type(activity, target_city):
-    from chinatravel.environment.tools.restaurants.apis import Restaurants
-
-    restaurants = Restaurants()
-    select_food_type = restaurants.select(
-        target_city, key="name", func=lambda x: x == activity["position"]
-    )["cuisine"]
-    if not select_food_type.empty:
-        return select_food_type.iloc[0]
+    food_type = _poi_field(Restaurants, target_city, activity["position"], "cuisine")
+    if food_type is not _MISSING:
+        return food_type
     return "empty"
 
 
 def attraction_type(activity, target_city):
-    from chinatravel.environment.tools.attractions.apis import Attractions
-
-    attractions = Attractions()
-    select_attr_type = attractions.select(
-        target_city, key="name", func=lambda x: x == activity["position"]
-    )["type"]
-    if not select_attr_type.empty:
-        return select_attr_type.iloc[0]
+    attr_type = _poi_field(Attractions, target_city, activity["position"], "type")
+    if attr_type is not _MISSING:
+        return attr_type
     return ""
 
 
 def accommodation_type(activity, target_city):
-    from chinatravel.environment.tools.accommodations.apis import Accommodations
-
-    accommodations = Accommodations()
-    select_hotel_type = accommodations.select(
-        target_city, key="name", func=lambda x: x == activity["position"]
-    )["featurehoteltype"]
-    if not select_hotel_type.empty:
-        return select_hotel_type.iloc[0]
+    hotel_type = _poi_field(
+        Accommodations, target_city, activity["position"], "featurehoteltype"
+    )
+    if hotel_type is not _MISSING:
+        return hotel_type
     return ""
 
 
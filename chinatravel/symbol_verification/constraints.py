@@ -0,0 +1,119 @@
+from functools import lru_cache
+
+from chinatravel.symbol_verification.concept_func import func_dict
+
+# the only builtins `hard_logic_py` code may use
+CONSTRAINT_BUILTINS = {"set": set}
+
+
+class CompileError:
+    """
+    A source that does not compile. Only the exception's type and arguments
+    are kept, and `exception()` builds a new one for every raise, so cached
+    failures don't collect the tracebacks (and plans) of past raises.
+    """
+
+    __slots__ = ("type", "args")
+
+    def __init__(self, error):
+        self.type = type(error)
+        self.args = error.args
+
+    def exception(self):
+        return self.type(*self.args)
+
+
+@lru_cache(maxsize=4096)
+def _compile_source(source: str):
+    try:
+        return compile(source, "<string>", "exec")
+    except (SyntaxError, ValueError) as e:
+        return CompileError(e)
+
+
+def compile_constraint(source):
+    """
+    Code object of one constraint, compiled once per source string. A
+    source that does not compile gives a `CompileError`, whose exception
+    `execute` raises as `exec` would.
+    """
+    if isinstance(source, str):
+        return _compile_source(source)
+    return source
+
+
+def execute(code, plan, builtins=CONSTRAINT_BUILTINS) -> dict:
+    """
+    Run a compiled constraint on `plan` and return its variables. The code
+    sees the concept functions and `plan` as locals, in a fresh namespace
+    each time, with only `builtins` available, as the verifiers always ran it.
+    """
+    if isinstance(code, CompileError):
+        raise code.exception()
+    namespace = dict(func_dict)
+    namespace["plan"] = plan
+    exec(code, {"__builtins__": builtins}, namespace)
+    return namespace
+
+
+class ConstraintSet:
+    """
+    The `hard_logic_py` constraints of a query, compiled once.
+
+        constraints = ConstraintSet.of(query["hard_logic_py"])
+        constraints.evaluate(plan)  # [True, False, ...]
+
+    `of` reuses the set of an identical list of constraints, so agents that
+    check many candidate plans against one query compile it once.
+    """
+
+    def __init__(self, sources, builtins=CONSTRAINT_BUILTINS):
+        self.sources = list(sources)
+        self.codes = [compile_constraint(source) for source in self.sources]
+        self.builtins = builtins
+
+    @classmethod
+    def of(cls, sources):
+        sources = tuple(sources)
+        try:
+            return _constraint_set(sources)
+        except TypeError:
+            return cls(sources)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def run(self, idx, plan) -> dict:
+        """Variables of constraint `idx` after running it on `plan`."""
+        return execute(self.codes[idx], plan, self.builtins)
+
+    def evaluate(self, plan, verbose=False) -> list:
+        """
+        Whether `plan` satisfies each constraint: its `result` variable as a
+        bool, False when it is missing or the code raises.
+        """
+        results = []
+        for idx, code in enumerate(self.codes):
+            try:
+                namespace = execute(code, plan, self.builtins)
+                results.append(bool(namespace.get("result", False)))
+            except Exception as e:
+                if verbose:
+                    print(f"Error evaluating constraint '{self.sources[idx]}': {e}")
+                results.append(False)
+        return results
+
+    def errors(self, plan) -> list:
+        """(index, exception) of each constraint that raises on `plan`."""
+        errors = []
+        for idx, code in enumerate(self.codes):
+            try:
+                execute(code, plan, self.builtins)
+            except Exception as e:
+                errors.append((idx, e))
+        return errors
+
+
+@lru_cache(maxsize=256)
+def _constraint_set(sources):
+    return ConstraintSet(sources)
@@ -8,6 +8,8 @@ from chinatravel.environment.tools.intercity_transport.apis import IntercityTran
 from chinatravel.environment.tools.transportation.apis import Transportation
 
 from chinatravel.symbol_verification.concept_func import func_dict
+from chinatravel.symbol_verification.constraints import ConstraintSet
+from chinatravel.symbol_verification.plan_features import PlanFeatures
 from chinatravel.evaluation.utils import load_json_file
 
 import pandas as pd
@@ -19,39 +21,42 @@ restaurants = Restaurants()
 attractions = Attractions()
 
 
-def calc_cost_from_itinerary_wo_intercity(itinerary, people_number):
+def calc_cost_from_itinerary_wo_intercity(itinerary, people_number, features=None):
     total_cost = 0
-    for day in itinerary:
-        for activity in day["activities"]:
-
-            for transport in activity.get("transports", []):
-
-                mode = transport["mode"]
-                if mode == "taxi":
-                    if "cars" in transport.keys():
-                        total_cost += transport.get("cars", 0) * transport.get(
-                            "cost", 0
-                        )
-                    else:
-                        total_cost += transport.get("tickets", 0) * transport.get(
-                            "cost", 0
-                        )
-                if mode == "metro":
-                    total_cost += transport.get("tickets", 0) * transport.get("cost", 0)
+    if features is not None:
+        activities = [act.activity for act in features.activities]
+    else:
+        activities = [act for day in itinerary for act in day["activities"]]
+    for activity in activities:
 
-            if (
-                activity["type"] == "breakfest"
-                or activity["type"] == "lunch"
-                or activity["type"] == "dinner"
-            ):
-                total_cost += activity.get("cost", 0) * people_number
+        for transport in activity.get("transports", []):
 
-            if activity["type"] == "attraction":
-                total_cost += activity.get("tickets", 0) * activity.get("cost", 0)
+            mode = transport["mode"]
+            if mode == "taxi":
+                if "cars" in transport.keys():
+                    total_cost += transport.get("cars", 0) * transport.get(
+                        "cost", 0
+                    )
+                else:
+                    total_cost += transport.get("tickets", 0) * transport.get(
+                        "cost", 0
+                    )
+            if mode == "metro":
+                total_cost += transport.get("tickets", 0) * transport.get("cost", 0)
+
+        if (
+            activity["type"] == "breakfest"
+            or activity["type"] == "lunch"
+            or activity["type"] == "dinner"
+        ):
+            total_cost += activity.get("cost", 0) * people_number
+
+        if activity["type"] == "attraction":
+            total_cost += activity.get("tickets", 0) * activity.get("cost", 0)
     return total_cost
 
 
-def get_symbolic_concepts(symbolic_input, plan_json, need_ood=False):
+def get_symbolic_concepts(symbolic_input, plan_json, need_ood=False, features=None):
 
     target_city = symbolic_input["target_city"]
     start_city = symbolic_input["start_city"]
@@ -92,6 +97,10 @@ def get_symbolic_concepts(symbolic_input, plan_json, need_ood=False):
     days = len(plan_json["itinerary"])
     people_number = plan_json["people_number"]
 
+    # the plan is walked and its POIs looked up once, see plan_features.py
+    if features is None:
+        features = PlanFeatures(plan_json, target_city)
+
     # Calculating total cost
     total_cost = 0
     transport_types = set()
@@ -120,130 +129,130 @@ def get_symbolic_concepts(symbolic_input, plan_json, need_ood=False):
 
     misssing_type = False
 
-    for day in plan_json["itinerary"]:
-        for activity in day["activities"]:
-            if not "type" in activity:
-                misssing_type = True
-                continue
+    for act in features.activities:
+        activity = act.activity
+        if not "type" in activity:
+            misssing_type = True
+            continue
 
-            if "tickets" in activity:
-                tickets = activity.get("tickets", 0)
-                tickets_list.append(tickets)
+        if "tickets" in activity:
+            tickets = activity.get("tickets", 0)
+            tickets_list.append(tickets)
 
-            for transport in activity.get("transports", []):
-                if "tickets" in transport.keys():
-                    tickets = transport.get("tickets", 0)
-                    tickets_list.append(tickets)
-
-                mode = transport["mode"]
-                if mode == "taxi":
-                    if "cars" in transport.keys():
-                        total_cost +=  transport.get(
-                            "cost", 0
-                        )
-                    else:
-                        total_cost +=  transport.get(
-                            "cost", 0
-                        )
-                if mode == "metro":
-                    total_cost += transport.get("cost", 0)
-
-                if mode in ["metro", "taxi"]:
-                    transport_types.add(mode)
-                if (
-                    mode == "walk"
-                    and len(activity.get("transports", [])) == 1
-                    and transport.get("distance", 2) > 1
-                ):
-                    transport_types.add(mode)
-
-            if activity["type"] == "airplane":
-
-                if "cost" in activity:
-                    total_cost += activity.get("cost", 0)
-                else:
-                    missing_cost = True
-                intercity_transport.add("airplane")
-
-            if activity["type"] == "train":
+        for transport in activity.get("transports", []):
+            if "tickets" in transport.keys():
+                tickets = transport.get("tickets", 0)
+                tickets_list.append(tickets)
 
-                if "cost" in activity:
-                    total_cost += activity.get("cost", 0)
+            mode = transport["mode"]
+            if mode == "taxi":
+                if "cars" in transport.keys():
+                    total_cost +=  transport.get(
+                        "cost", 0
+                    )
                 else:
-                    missing_cost = True
-                intercity_transport.add("train")
-                train_id = activity.get("TrainID", "")
-                if train_id:
-                    train_type.add(train_id[0])
-
-            if not "position" in activity:
-                continue
-
+                    total_cost +=  transport.get(
+                        "cost", 0
+                    )
+            if mode == "metro":
+                total_cost += transport.get("cost", 0)
+
+            if mode in ["metro", "taxi"]:
+                transport_types.add(mode)
             if (
-                activity["type"] == "breakfest"
-                or activity["type"] == "lunch"
-                or activity["type"] == "dinner"
+                mode == "walk"
+                and len(activity.get("transports", [])) == 1
+                and transport.get("distance", 2) > 1
             ):
-                select_food_type = restaurants.select(
-                    target_city, key="name", func=lambda x: x == activity["position"]
-                )["cuisine"]
-                if not select_food_type.empty:
-                    food_type.add(select_food_type.iloc[0])
-                restaurant_names.add(activity["position"])
-
-                if "cost" in activity:
-                    food_prices.append(activity["cost"])
-                    total_cost += activity.get("cost", 0) 
-                else:
-                    missing_cost = True
-
-            if activity["type"] == "accommodation":
-                select_hotel_type = accommodation.select(
-                    target_city, key="name", func=lambda x: x == activity["position"]
-                )["featurehoteltype"]
-                if not select_hotel_type.empty:
-                    hotel_feature.add(select_hotel_type.iloc[0])
-                hotel_names.add(activity["position"])
-
-                if "cost" in activity:
-                    hotel_prices.append(activity["cost"])
-                    total_cost +=  activity.get("cost", 0)
-                else:
-                    missing_cost = True
-
-                rooms = activity.get("rooms", 0)
-                room_type = activity.get("room_type", 1)
-
-                rooms_list.append(rooms)
-                room_types_list.append(room_type)
-
-            if activity["type"] == "attraction":
-                select_attraction_type = attractions.select(
-                    target_city, key="name", func=lambda x: x == activity["position"]
-                )["type"]
-                if not select_attraction_type.empty:
-                    spot_type.add(select_attraction_type.iloc[0])
-
-                if need_ood:
-                    # print(target_city, symbolic_input)
-                    # print(ood_attractions_dataframe)
-                    # print(ood_attractions_dataframe.loc[ood_attractions_dataframe['name'] == activity["position"]])
-
-                    attraction_sel = ood_attractions_dataframe.loc[
-                        ood_attractions_dataframe["name"] == activity["position"]
-                    ]
-                    if len(attraction_sel) > 0:
-                        attraction_info = attraction_sel.iloc[0]
-                        # print(attraction_info)
-                        for ood_type in ood_type_dict:
-                            if attraction_info[ood_type] == 1:
-                                spot_type.add(ood_type_dict[ood_type])
-                attraction_names.add(activity["position"])
-
-                if "cost" in activity:
-                    total_cost += activity.get("cost", 0)
-                else:
-                    missing_cost = True
+                transport_types.add(mode)
+
+        if activity["type"] == "airplane":
+
+            if "cost" in activity:
+                total_cost += activity.get("cost", 0)
+            else:
+                missing_cost = True
+            intercity_transport.add("airplane")
+
+        if activity["type"] == "train":
+
+            if "cost" in activity:
+                total_cost += activity.get("cost", 0)
+            else:
+                missing_cost = True
+            intercity_transport.add("train")
+            train_id = activity.get("TrainID", "")
+            if train_id:
+                train_type.add(train_id[0])
+
+        if not "position" in activity:
+            continue
+
+        if (
+            activity["type"] == "breakfest"
+            or activity["type"] == "lunch"
+            or activity["type"] == "dinner"
+        ):
+            select_food_type = features.lookup(
+                "restaurant", activity["position"]
+            )["cuisine"]
+            if not select_food_type.empty:
+                food_type.add(select_food_type.iloc[0])
+            restaurant_names.add(activity["position"])
+
+            if "cost" in activity:
+                food_prices.append(activity["cost"])
+                total_cost += activity.get("cost", 0) 
+            else:
+                missing_cost = True
+
+        if activity["type"] == "accommodation":
+            select_hotel_type = features.lookup(
+                "accommodation", activity["position"]
+            )["featurehoteltype"]
+            if not select_hotel_type.empty:
+                hotel_feature.add(select_hotel_type.iloc[0])
+            hotel_names.add(activity["position"])
+
+            if "cost" in activity:
+                hotel_prices.append(activity["cost"])
+                total_cost +=  activity.get("cost", 0)
+            else:
+                missing_cost = True
+
+            rooms = activity.get("rooms", 0)
+            room_type = activity.get("room_type", 1)
+
+            rooms_list.append(rooms)
+            room_types_list.append(room_type)
+
+        if activity["type"] == "attraction":
+            select_attraction_type = features.lookup(
+                "attraction", activity["position"]
+            )["type"]
+            if not select_attraction_type.empty:
+                spot_type.add(select_attraction_type.iloc[0])
+
+            if need_ood:
+                # print(target_city, symbolic_input)
+                # print(ood_attractions_dataframe)
+                # print(ood_attractions_dataframe.loc[ood_attractions_dataframe['name'] == activity["position"]])
+
+                attraction_sel = ood_attractions_dataframe.loc[
+                    ood_attractions_dataframe["name"] == activity["position"]
+                ]
+                if len(attraction_sel) > 0:
+                    attraction_info = attraction_sel.iloc[0]
+                    # print(attraction_info)
+                    for ood_type in ood_type_dict:
+                        if attraction_info[ood_type] == 1:
+                            spot_type.add(ood_type_dict[ood_type])
+            attraction_names.add(activity["position"])
+
+            if "cost" in activity:
+                total_cost += activity.get("cost", 0)
+            else:
+                missing_cost = True
     # print(spot_type)
     # Calculating average food and hotel prices
     food_price = sum(food_prices) / len(food_prices) if food_prices else 0
@@ -262,22 +271,22 @@ def get_symbolic_concepts(symbolic_input, plan_json, need_ood=False):
     cost_intercity_transport = 0
     intercity_transport_activity = {"go": {}, "back": {}}
     cost_intercity_transport_missing = False
-    for day in plan_json["itinerary"]:
-        for activity in day["activities"]:
-            if not type in activity:
-                continue
-            if activity["type"] == "attraction":
-                cost_attraction += activity.get("tickets", 0) * activity.get("cost", 0)
-            if activity["type"] == "airplane" or activity["type"] == "train":
-                if "cost" in activity and "ticket" in activity:
-                    cost_intercity_transport += activity.get(
-                        "tickets", 0
-                    ) * activity.get("cost", 0)
-                else:
-                    cost_intercity_transport_missing = True
-
-            if activity["type"] == "accommodation":
-                cost_hotel += activity.get("rooms", 0) * activity.get("cost", 0)
+    for act in features.activities:
+        activity = act.activity
+        if not type in activity:
+            continue
+        if activity["type"] == "attraction":
+            cost_attraction += activity.get("tickets", 0) * activity.get("cost", 0)
+        if activity["type"] == "airplane" or activity["type"] == "train":
+            if "cost" in activity and "ticket" in activity:
+                cost_intercity_transport += activity.get(
+                    "tickets", 0
+                ) * activity.get("cost", 0)
+            else:
+                cost_intercity_transport_missing = True
+
+        if activity["type"] == "accommodation":
+            cost_hotel += activity.get("rooms", 0) * activity.get("cost", 0)
     from datetime import datetime
 
     try:
@@ -404,7 +413,6 @@ def evaluate_constraints(extracted_vars, hard_logic):
 
 
 def evaluate_constraints_py(hard_logic_py, plan, verbose=False):
-    results = []
     debug_logic_py = """
 result = True
 for activity in allactivities(plan):
@@ -416,33 +424,8 @@ for activity in allactivities(plan):
         print(innercity_transport_type(activity_transports(activity)), metro_tickets(activity_transports(activity)))
 """
     # hard_logic_py.append(debug_logic_py)
-    for constraint in hard_logic_py:
-        vars_dict = deepcopy(func_dict)
-        vars_dict["plan"] = plan
-        # exec(constraint, {"__builtins__": {"set": set, "print": print}}, vars_dict)
-        # results.append(vars_dict.get("result", False))
-        try:
-            # Evaluate the constraint in a safe manner
-            exec(
-                constraint,
-                {
-                    "__builtins__": {
-                        "set": set,
-                    }
-                },
-                vars_dict,
-            )
-            res_i = vars_dict.get("result", False)
-            # print("result: ", res_i)
-            # print(type(res_i))
-            results.append(bool(res_i))
-            # results.append(result)
-        except Exception as e:
-            if verbose:
-                print(f"Error evaluating constraint '{constraint}': {e}")
-            results.append(False)
-        # print(results)
-    return results
+    # compiled once per list of constraints, see constraints.py
+    return ConstraintSet.of(hard_logic_py).evaluate(plan, verbose=verbose)
 
 if __name__ == "__main__":
 
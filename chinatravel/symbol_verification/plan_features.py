@@ -0,0 +1,121 @@
+from chinatravel.environment.timeutil import to_minutes
+from chinatravel.environment.tools.accommodations.apis import Accommodations
+from chinatravel.environment.tools.restaurants.apis import Restaurants
+from chinatravel.environment.tools.attractions.apis import Attractions
+from chinatravel.symbol_verification.tool_cache import hashable, shared_tool
+
+MEALS = ("breakfast", "lunch", "dinner")
+
+_TABLES = {
+    "attraction": Attractions,
+    "restaurant": Restaurants,
+    "accommodation": Accommodations,
+}
+
+
+def _minutes(time_str):
+    """'HH:MM' (or '次日HH:MM') to minutes, None if it is not a time."""
+    try:
+        return to_minutes(time_str.split("次日")[-1])
+    except Exception:
+        return None
+
+
+class ActivityFeatures:
+    """
+    One activity of the walk. `activity` is the plan's own dict; `type` and
+    `position` are None where the activity has none, `start` and `end` its
+    times in minutes, None where they are missing or not times.
+    """
+
+    __slots__ = ("day", "activity", "type", "position", "start", "end")
+
+    def __init__(self, day, activity):
+        self.day = day
+        self.activity = activity
+        try:
+            self.type = activity["type"]
+        except Exception:
+            self.type = None
+        if isinstance(activity, dict):
+            self.position = activity.get("position")
+            self.start = _minutes(activity.get("start_time"))
+            self.end = _minutes(activity.get("end_time"))
+        else:
+            self.position = self.start = self.end = None
+
+
+class PlanFeatures:
+    """
+    The itinerary of a plan walked once, for all the checkers and metrics
+    that read it: its activities in plan order, grouped by type, with their
+    times parsed, and the POIs they name resolved against the sandbox tables.
+
+        features = PlanFeatures(plan, query["target_city"])
+        for act in features.of_type("attraction"):
+            rows = features.lookup("attraction", act.position)
+
+    `lookup` gives what `get_by_name` gives and remembers it for the plan,
+    so a POI is looked up once however many checkers ask, and not at all
+    if none does (a checker run on its own pays for its lookups only).
+    Activities are kept as they are in the plan, so the checkers handle
+    missing keys and malformed entries as before; an itinerary that can't
+    be walked raises the error of the walk when `activities` is read.
+    """
+
+    def __init__(self, plan_json, city=None):
+        self.plan_json = plan_json
+        self.city = city
+        self._rows = {}
+        self._by_type = {}
+        self._activities = None
+        self._error = None
+        try:
+            self._walk(plan_json["itinerary"])
+        except Exception as e:
+            self._error = e
+
+    def _walk(self, itinerary):
+        activities = []
+        for day, day_plan in enumerate(itinerary):
+            for activity in day_plan["activities"]:
+                act = ActivityFeatures(day, activity)
+                activities.append(act)
+                if isinstance(act.type, str):
+                    self._by_type.setdefault(act.type, []).append(act)
+        self._activities = activities
+
+    @property
+    def activities(self):
+        if self._error is not None:
+            raise self._error
+        return self._activities
+
+    def of_type(self, *types):
+        """Activities of the given types, in plan order."""
+        if self._error is not None:
+            raise self._error
+        if len(types) == 1:
+            return self._by_type.get(types[0], [])
+        key = tuple(types)
+        cached = self._by_type.get(key)
+        if cached is None:
+            cached = self._by_type[key] = [
+                act for act in self.activities if act.type in types
+            ]
+        return cached
+
+    def lookup(self, table, name, city=None):
+        """
+        Rows named `name` in the "attraction", "restaurant" or
+        "accommodation" table of `city` (by default the plan's).
+        """
+        city = self.city if city is None else city
+        tool = shared_tool(_TABLES[table])
+        if not hashable(table, city, name):
+            return tool.get_by_name(city, name)
+        rows = self._rows.get((table, city, name))
+        if rows is None:
+            rows = self._rows[table, city, name] = tool.get_by_name(city, name)
+        return rows
+
@@ -0,0 +1,230 @@
+from collections import Counter
+
+MEALS = ("breakfast", "lunch", "dinner")
+POI_TYPES = MEALS + ("attraction",)
+
+# totals kept per prefix, in this order
+_TOTALS = (
+    "poi_cost",
+    "attraction_cost",
+    "restaurant_cost",
+    "innercity_cost",
+    "tickets",
+)
+_ZERO = (0,) * len(_TOTALS)
+
+
+def _innercity_cost(activity):
+    return sum(transport.get("cost", 0) for transport in activity.get("transports", []))
+
+
+def _fingerprint(activity):
+    return (
+        activity.get("type"),
+        activity.get("position"),
+        activity.get("start_time"),
+        activity.get("end_time"),
+        activity.get("cost"),
+        activity.get("tickets"),
+        _innercity_cost(activity),
+    )
+
+
+class PlanPrefix:
+    """
+    Running aggregates of the itinerary a depth-first search is building:
+    costs, ticket counts, meals per day and the visited places, updated in
+    O(1) when an activity is pushed or popped instead of summed over the
+    whole plan at every node.
+
+        prefix = PlanPrefix()
+        prefix.sync(plan)  # at each node of the search
+        if prefix.poi_cost + fixed_cost > budget:
+            ...  # no extension of this plan fits the budget
+
+    Every prefix keeps its own totals, so popping restores them exactly and
+    sums are taken in plan order, as the loops they replace did.
+
+    `visits` counts (activity type, position) of each pushed activity, and
+    ("restaurant", position) for lunch and dinner, plus the keys
+    `describe(activity)` gives for it, e.g. ("cuisine", "川菜"); `kinds`
+    counts the first fields of those keys.
+    """
+
+    def __init__(self, describe=None):
+        self.describe = describe
+        # (day, index in the day, fingerprint, keys, totals)
+        self._stack = []
+        self.visits = Counter()
+        self.kinds = Counter()
+        self.meals = Counter()
+
+    def __len__(self):
+        return len(self._stack)
+
+    def _totals(self):
+        return self._stack[-1][4] if self._stack else _ZERO
+
+    def __getattr__(self, name):
+        if name in _TOTALS:
+            return self._totals()[_TOTALS.index(name)]
+        raise AttributeError(name)
+
+    def push(self, day, activity, index=None):
+        """Add `activity`, the `index`-th (by default the next) of `day`."""
+        if index is None:
+            last = self._stack[-1] if self._stack else None
+            index = last[1] + 1 if last is not None and last[0] == day else 0
+        act_type = activity.get("type")
+        cost = activity.get("cost", 0) if act_type in POI_TYPES else 0
+        poi, attraction, restaurant, innercity, tickets = self._totals()
+        totals = (
+            poi + cost,
+            attraction + cost if act_type == "attraction" else attraction,
+            restaurant + cost if act_type in MEALS else restaurant,
+            innercity + _innercity_cost(activity),
+            tickets + (activity.get("tickets") or 0),
+        )
+        keys = [(act_type, activity.get("position"))]
+        if act_type in ("lunch", "dinner"):
+            keys.append(("restaurant", activity.get("position")))
+        if self.describe is not None:
+            keys.extend(self.describe(activity))
+        self.visits.update(keys)
+        self.kinds.update(kind for kind, _ in keys)
+        if act_type in MEALS:
+            self.meals[day, act_type] += 1
+        self._stack.append((day, index, _fingerprint(activity), keys, totals))
+
+    def pop(self):
+        day, _, fingerprint, keys, _ = self._stack.pop()
+        self.visits.subtract(keys)
+        self.kinds.subtract(kind for kind, _ in keys)
+        if fingerprint[0] in MEALS:
+            self.meals[day, fingerprint[0]] -= 1
+
+    def clear(self):
+        self._stack = []
+        self.visits = Counter()
+        self.kinds = Counter()
+        self.meals = Counter()
+
+    def sync(self, plan):
+        """
+        Bring the aggregates in line with `plan` (a list of days), popping
+        the activities that left its end and pushing the new ones. Only the
+        end of the plan is compared, so a search must sync after each
+        append, before it pops anything older, as `dfs_poi` does by syncing
+        on entry.
+        """
+        while self._stack:
+            day, index, fingerprint, _, _ = self._stack[-1]
+            if day < len(plan):
+                activities = plan[day]["activities"]
+                if index < len(activities) and (
+                    _fingerprint(activities[index]) == fingerprint
+                ):
+                    break
+            self.pop()
+        day, index = 0, 0
+        if self._stack:
+            day, index = self._stack[-1][0], self._stack[-1][1] + 1
+        for day in range(day, len(plan)):
+            activities = plan[day]["activities"]
+            for index in range(index, len(activities)):
+                self.push(day, activities[index], index)
+            index = 0
+        return self
+
+    def has_meal(self, day, meal):
+        return self.meals[day, meal] > 0
+
+    def visited(self, kind, value):
+        return self.visits[kind, value] > 0
+
+    def decided(self, requirement):
+        """
+        {key: outcome} for the keys of `requirement` (a dict in the agents'
+        constraint DSL) that no extension of this plan can change: False for
+        a must-not place or type already visited, or a paid attraction under
+        `only_free_attractions`, True for must-visit lists already covered.
+        Visits are only ever added as the plan grows, so these stay decided;
+        keys left out are still open. Types and paid attractions need a
+        `describe` giving ("attraction_type", type), ("cuisine", cuisine) and
+        ("paid_attraction", name) keys.
+        """
+        res = {}
+        for key, kind in (
+            ("must_not_see_attraction", "attraction"),
+            ("must_not_see_attraction_type", "attraction_type"),
+            ("must_not_visit_restaurant", "restaurant"),
+            ("must_not_visit_restaurant_type", "cuisine"),
+        ):
+            if key in requirement and any(
+                self.visited(kind, value) for value in requirement[key]
+            ):
+                res[key] = False
+        if "only_free_attractions" in requirement and self.kinds["paid_attraction"]:
+            res["only_free_attractions"] = False
+        for key, kind in (
+            ("must_see_attraction", "attraction"),
+            ("must_see_attraction_type", "attraction_type"),
+            ("must_visit_restaurant", "restaurant"),
+            ("must_visit_restaurant_type", "cuisine"),
+        ):
+            if key in requirement and all(
+                self.visited(kind, value) for value in requirement[key]
+            ):
+                res[key] = True
+        return res
+
+
+if __name__ == "__main__":
+
+    def cost(plan, types):
+        return sum(
+            act["cost"]
+            for day in plan
+            for act in day["activities"]
+            if act["type"] in types
+        )
+
+    def act(type, position, cost, transport=0):
+        return {
+            "type": type,
+            "position": position,
+            "cost": cost,
+            "start_time": "10:00",
+            "end_time": "11:00",
+            "transports": [{"cost": transport}],
+        }
+
+    prefix = PlanPrefix(
+        lambda a: [("cuisine", "川菜")] if a["type"] in MEALS else []
+    )
+    plan = [{"day": 1, "activities": [act("train", "上海站", 0)]}]
+    steps = [
+        lambda: plan[0]["activities"].append(act("lunch", "面馆", 30.1, 2)),
+        lambda: plan[0]["activities"].append(act("attraction", "外滩", 0.2)),
+        lambda: plan[0]["activities"].pop(),
+        lambda: plan[0]["activities"].append(act("attraction", "豫园", 40)),
+        lambda: plan.append({"day": 2, "activities": [act("breakfast", "酒店", 0.3)]}),
+        lambda: plan[1]["activities"].append(act("dinner", "饭店", 70)),
+        lambda: plan.pop(),
+        lambda: plan[0]["activities"].pop(),
+    ]
+    for step in steps:
+        step()
+        prefix.sync(plan)
+        assert prefix.poi_cost == cost(plan, POI_TYPES), (prefix.poi_cost, plan)
+        assert prefix.restaurant_cost == cost(plan, MEALS)
+        assert prefix.attraction_cost == cost(plan, ["attraction"])
+        assert prefix.has_meal(1, "dinner") == (
+            len(plan) > 1 and plan[1]["activities"][-1]["type"] == "dinner"
+        )
+    assert len(prefix) == 2 and prefix.innercity_cost == 2
+    assert prefix.visited("lunch", "面馆") and not prefix.visited("attraction", "外滩")
+    assert prefix.decided(
+        {"must_visit_restaurant_type": ["川菜"], "must_not_see_attraction": ["外滩"]}
+    ) == {"must_visit_restaurant_type": True}
+    print("PlanPrefix OK")
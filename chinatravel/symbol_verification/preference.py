@@ -8,6 +8,7 @@ from chinatravel.environment.tools.intercity_transport.apis import IntercityTran
 from chinatravel.environment.tools.transportation.apis import Transportation
 
 from chinatravel.symbol_verification.concept_func import func_dict
+from chinatravel.symbol_verification.constraints import compile_constraint, execute
 from chinatravel.evaluation.utils import load_json_file
 
 import pandas as pd
@@ -21,6 +22,9 @@ attractions = Attractions()
 from .concept_func import *
 
 
+PREFERENCE_BUILTINS = {"set": set, "list": list}
+
+
 def evaluate_preference_py(preference_list, plan, verbose=False):
 
 
@@ -53,21 +57,9 @@ def evaluate_preference_py(preference_list, plan, verbose=False):
     results = []
     # hard_logic_py.append(debug_logic_py)
     for _, preference_concept, preference_code in preference_list:
-        vars_dict = deepcopy(func_dict)
-        vars_dict["plan"] = plan
-        # exec(constraint, {"__builtins__": {"set": set, "print": print}}, vars_dict)
-        # results.append(vars_dict.get("result", False))
         try:
-            # Evaluate the constraint in a safe manner
-            exec(
-                preference_code,
-                {
-                    "__builtins__": {
-                        "set": set,
-                        "list": list,
-                    }
-                },
-                vars_dict,
+            vars_dict = execute(
+                compile_constraint(preference_code), plan, PREFERENCE_BUILTINS
             )
             res_i = vars_dict.get(preference_concept, None)
             # if type(res_i) != float:
@@ -0,0 +1,19 @@
+from functools import lru_cache
+
+
+# The verifiers run for every activity of every plan, so they share one
+# instance per tool, backed by the process-wide SandboxDatabase and its name
+# indexes.
+@lru_cache(maxsize=None)
+def shared_tool(cls):
+    """The instance of the tool class `cls` shared by the verifiers."""
+    return cls()
+
+
+def hashable(*args):
+    """Whether `args` can key a cache."""
+    try:
+        hash(args)
+    except TypeError:
+        return False
+    return True
@@ -46,6 +46,7 @@ if __name__ == "__main__":
         default=None
     )
     
+    parser.add_argument('--lazy_db', action='store_true', help='Load the sandbox database per city on first access (default when --index is given).')
     parser.add_argument('--oracle_translation', action='store_true', help='Set this flag to enable oracle translation.')
     parser.add_argument('--preference_search', action='store_true', help='Set this flag to enable preference search.')
     parser.add_argument('--refine_steps', type=int, default=10, help='Steps for refine-based method, such as LLM-modulo, Reflection')
@@ -97,7 +98,7 @@ if __name__ == "__main__":
         max_model_len = None
     kwargs = {
         "method": args.agent,
-        "env": WorldEnv(),
+        "env": WorldEnv(lazy=(args.lazy_db or args.index is not None) or None),
         "backbone_llm": init_llm(args.llm, max_model_len=max_model_len),
         "cache_dir": cache_dir,
         "log_dir": log_dir, 
@@ -165,3 +166,4 @@ if __name__ == "__main__":
         save_json_file(
             json_data=plan, file_path=os.path.join(res_dir, f"{data_idx}.json")
         )
+        kwargs["env"].transportation.save_route_cache()
@@ -45,6 +45,7 @@ if __name__ == "__main__":
         default=None
     )
     
+    parser.add_argument('--lazy_db', action='store_true', help='Load the sandbox database per city on first access (default when --index is given).')
     parser.add_argument('--oracle_translation', action='store_true', help='Set this flag to enable oracle translation.')
 
     args = parser.parse_args()
@@ -85,7 +86,7 @@ if __name__ == "__main__":
 
     kwargs = {
         "method": args.agent,
-        "env": WorldEnv(),
+        "env": WorldEnv(lazy=(args.lazy_db or args.index is not None) or None),
         "backbone_llm": init_llm(args.llm),
         "cache_dir": cache_dir,
         "log_dir": log_dir, 
@@ -123,3 +124,4 @@ if __name__ == "__main__":
         save_json_file(
             json_data=plan, file_path=os.path.join(res_dir, f"{data_idx}.json")
         )
+        kwargs["env"].transportation.save_route_cache()
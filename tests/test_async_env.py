@@ -0,0 +1,27 @@
+import asyncio
+
+import pytest
+
+from chinatravel.environment.async_env import AsyncWorldEnv
+from chinatravel.environment.world_env import WorldEnv
+
+
+@pytest.fixture(scope="module")
+def env():
+    return WorldEnv()
+
+
+@pytest.mark.parametrize(
+    "cmd", [None, 42, ["goto()"], "goto(\0)", "goto(", "no_such_tool()"]
+)
+def test_invalid_command_gives_failed_output(env, cmd):
+    async def run():
+        async with AsyncWorldEnv(env) as async_env:
+            return await async_env(cmd), async_env.results
+
+    out, results = asyncio.run(run())
+    expected = env(cmd)
+    assert not out["success"] and not expected["success"]
+    assert out["data"].startswith("Invalid command.")
+    assert out["data"] == expected["data"]
+    assert len(results) == 1
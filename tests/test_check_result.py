@@ -0,0 +1,103 @@
+import ast
+import copy
+import inspect
+
+import pandas as pd
+import pytest
+
+from chinatravel.symbol_verification import commonsense_constraint as cc
+from chinatravel.symbol_verification.check_result import CheckResult, CheckTable
+
+
+def test_check_result():
+    res = CheckResult(("a", "b"))
+    res.fill([0, 0])
+    res.set("b")
+    assert res.sum() == 1 and res.iloc[0].tolist() == [0, 1]
+    assert res.to_frame().equals(pd.DataFrame([[0, 1]], columns=["a", "b"]))
+    with pytest.raises(KeyError):
+        res.set("x")
+    with pytest.raises(ValueError):
+        res.fill([0, 0, 0])
+
+
+def test_check_table():
+    table = CheckTable(["q0", "q1", "q2"], ("a", "b", "c"))
+    table.put(0, CheckResult(("a", "b"), [0, 1]))
+    table.put(2, CheckResult(("a", "b"), [1, 1]))
+    table.put(1, CheckResult(("c",), [1]))
+    assert table.row_sum(0) == 1 and table.row_sum(1) == 1
+    frame = table.to_frame()
+    assert list(frame.columns) == ["data_id", "a", "b", "c"]
+    assert frame.to_csv(index=False) == (
+        "data_id,a,b,c\nq0,0,1,0\nq1,0,0,1\nq2,1,1,0\n"
+    )
+
+
+def set_columns():
+    tree = ast.parse(inspect.getsource(cc))
+    for node in ast.walk(tree):
+        if (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Attribute)
+            and node.func.attr == "set"
+            and getattr(node.func.value, "id", None) == "table_statistics"
+        ):
+            yield node.lineno, node.args[0].value
+
+
+def test_set_columns_are_declared():
+    for lineno, column in set_columns():
+        assert column in cc.COMMONSENSE_COLUMNS, (lineno, column)
+
+
+def legs(mode):
+    return copy.deepcopy(
+        cc.innercity_transport.goto(
+            "上海", "上海景点1", "上海景点2", "08:00", mode, verbose=False
+        )
+    )
+
+
+def plan(transports):
+    activity = {"type": "attraction", "position": "上海景点2"}
+    activity["transports"] = transports
+    return {"itinerary": [{"day": 1, "activities": [activity]}]}
+
+
+COST = "Incorrect cost information of Inner-City Transport"
+DURATION = "Incorrect Duration Information of Inner-City Transport"
+QUERY = {"target_city": "上海"}
+
+
+def wrong_legs():
+    walk, taxi, metro, timeless = (
+        legs("walk"), legs("taxi"), legs("metro"), legs("walk")
+    )
+    walk[0]["cost"] = 1
+    taxi[0].update(price=taxi[0]["cost"], cars=1, cost=taxi[0]["cost"] + 5)
+    metro[1].update(price=metro[1]["cost"], tickets=1, cost=metro[1]["cost"] + 7)
+    del timeless[0]["end_time"]
+    return {"walk": walk, "taxi": taxi, "metro": metro, "timeless": timeless}
+
+
+@pytest.mark.parametrize(
+    "name, column",
+    [("walk", COST), ("taxi", COST), ("metro", COST), ("timeless", DURATION)],
+)
+def test_transport_reports_declared_columns(name, column):
+    res, _ = cc.Is_transport_correct(QUERY, plan(wrong_legs()[name]))
+    assert res.columns == cc.TRANSPORT_COLUMNS
+    assert res.flags[res.columns.index(column)] == 1
+
+
+def test_transport_columns_in_table():
+    wrong = wrong_legs()
+    table = CheckTable(["walk", "timeless"], cc.COMMONSENSE_COLUMNS)
+    for row, name in enumerate(["walk", "timeless"]):
+        res, _ = cc.Is_transport_correct(QUERY, plan(wrong[name]))
+        table.put(row, res)
+    frame = table.to_frame()
+    assert list(frame.columns[1:]) == list(cc.TRANSPORT_COLUMNS)
+    assert frame[COST].tolist() == [1, 0] and frame[DURATION].tolist() == [0, 1]
+    assert frame[COST].dtype == frame[DURATION].dtype == "int64"
@@ -0,0 +1,12 @@
+import pytest
+
+from chinatravel.symbol_verification.concept_func import poi_recommend_time
+
+
+def test_poi_recommend_time():
+    assert poi_recommend_time("上海", "上海景点1") >= 0
+
+
+def test_missing_poi_is_named():
+    with pytest.raises(LookupError, match="无此景点"):
+        poi_recommend_time("上海", "无此景点")
@@ -0,0 +1,31 @@
+import pytest
+
+from chinatravel.symbol_verification.constraints import ConstraintSet
+
+
+def depth(error):
+    frames, tb = 0, error.__traceback__
+    while tb is not None:
+        frames, tb = frames + 1, tb.tb_next
+    return frames
+
+
+def test_syntax_error_is_raised_fresh_each_time():
+    constraints = ConstraintSet(["result = (", "result = True"])
+    raised = []
+    for _ in range(3):
+        with pytest.raises(SyntaxError) as info:
+            constraints.run(0, {})
+        raised.append(info.value)
+    assert len({id(e) for e in raised}) == 3
+    # a cached exception raised again grew its traceback by every raise
+    assert depth(raised[0]) == depth(raised[-1])
+    assert raised[0].lineno == raised[-1].lineno and raised[0].msg == raised[-1].msg
+
+
+def test_evaluate_reports_syntax_errors_as_false():
+    constraints = ConstraintSet(["result = (", "result = True"])
+    for _ in range(1000):
+        assert constraints.evaluate({}) == [False, True]
+    (idx, error), = constraints.errors({})
+    assert idx == 0 and isinstance(error, SyntaxError)
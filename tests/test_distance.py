@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from geopy.distance import geodesic
+
+from chinatravel.environment.distance import distance, many_to_many, one_to_many
+
+
+@pytest.fixture(scope="module")
+def points():
+    rng = np.random.default_rng(0)
+    points = np.c_[18 + rng.random(2000) * 35, 75 + rng.random(2000) * 60]
+    points[:200] = np.c_[31.2 + rng.random(200) * 0.5, 121.3 + rng.random(200) * 0.5]
+    points[1] = points[0]
+    return points
+
+
+def test_many_to_many(points):
+    expected = np.array(
+        [[geodesic(p, q).km for q in points[:200]] for p in points[:200]]
+    )
+    matrix = many_to_many(points[:200], points[:200])
+    assert np.abs(matrix - expected).max() < 1e-6
+    # what `goto` reports: taxi and metro distances rounded to 2 decimals
+    assert (np.round(matrix, 2) == np.round(expected, 2)).all()
+
+
+def test_one_to_many(points):
+    expected = np.array([geodesic(points[0], q).km for q in points])
+    assert np.abs(one_to_many(points[0], points) - expected).max() < 1e-6
+    pairs = [distance(points[0], q) for q in points]
+    assert np.abs(np.array(pairs) - expected).max() < 1e-6
+    assert distance(points[0], points[1]) == 0.0
+
+    spherical = one_to_many(points[0], points[2:], mode="haversine")
+    assert (np.abs(spherical / expected[2:] - 1) < 0.006).all()
+
+
+def poi_pairs():
+    from chinatravel.environment.tools.poi.apis import Poi
+
+    poi = Poi()
+    positions = np.array(
+        [p for city in poi.city_cn_list for p in poi.data[city].values()], dtype=float
+    )
+    rng = np.random.default_rng(0)
+    return positions[rng.choice(len(positions), size=(500, 2))]
+
+
+SPECIAL = np.array(
+    [
+        [[31.23, 121.47], [31.23, 121.47]],  # identical
+        [[0.0, 0.0], [0.0, 180.0]],  # antipodal on the equator
+        [[31.23, 121.47], [-31.23, -58.53]],  # antipodal
+        [[0.1, 0.0], [-0.1, 179.9]],  # nearly antipodal
+        [[90.0, 0.0], [-90.0, 0.0]],  # pole to pole
+    ]
+)
+
+
+def test_pairs_match_geopy():
+    for a, b in np.concatenate([poi_pairs(), SPECIAL]):
+        expected = geodesic(a, b).km
+        assert distance(a, b, mode="exact") == expected
+        assert abs(distance(a, b) - expected) < 1e-6, (a, b)
+        assert round(distance(a, b), 2) == round(expected, 2), (a, b)
+        assert abs(one_to_many(a, [b])[0] - expected) < 1e-6, (a, b)
+
+
+@pytest.mark.parametrize(
+    "call",
+    [
+        lambda points: distance("No such point", points[0]),
+        lambda points: one_to_many("No such point", points[:2]),
+    ],
+    ids=["distance", "one_to_many"],
+)
+def test_string_point_raises_geopy_error(points, call):
+    # as with geopy, a POI lookup's error message is not a point
+    with pytest.raises(ValueError, match="Point"):
+        call(points)
@@ -0,0 +1,35 @@
+import pandas as pd
+import pytest
+
+from chinatravel.environment.indexes import NgramIndex, build_token_index
+from chinatravel.environment.tools.restaurants.apis import Restaurants
+
+
+def test_index_postings_are_read_only():
+    data = pd.DataFrame({"food": ["烤鸭,炸酱面", "小笼包", None]})
+    index = NgramIndex.from_table(data, "food")
+    for rows in [index.valid, index.search(""), index.search("烤"), index.search("zz")]:
+        assert not rows.flags.writeable
+    for rows in build_token_index(data, "food").values():
+        assert not rows.flags.writeable
+
+
+@pytest.fixture(scope="module")
+def restaurants():
+    return Restaurants()
+
+
+def test_positions_cannot_change_the_index(restaurants):
+    cuisine = restaurants.get_cuisine_list("上海")[0]
+    dish = restaurants.data["上海"]["recommendedfood"].dropna().iloc[0].split(",")[0]
+    food = dish[:1]
+    for rows in [
+        restaurants.cuisine_positions("上海", cuisine),
+        restaurants.cuisine_positions("上海", "无此菜系"),
+        restaurants.food_positions("上海", food),
+        restaurants.food_positions("上海", dish.strip(), exact=True),
+    ]:
+        with pytest.raises(ValueError):
+            rows[:1] = -1
+    rows = restaurants.cuisine_positions("上海", cuisine)
+    assert len(rows) and rows[0] >= 0
@@ -0,0 +1,26 @@
+import pytest
+
+from chinatravel.environment.tools.intercity_transport.apis import IntercityTransport
+from chinatravel.environment.world_env import WorldEnv
+
+
+@pytest.mark.parametrize(
+    "window",
+    [(), ("08:00", "12:00"), ("00:00", None, "20:00"), ("00:00", None, None, 500)],
+)
+def test_select_is_read_only(window):
+    res = IntercityTransport().select("北京", "上海", "train", *window)
+    if len(res) == 0:
+        pytest.skip("no trains in the window")
+    with pytest.raises(ValueError):
+        res.loc[res.index[0], "Cost"] = 1
+
+
+def test_whole_data_does_not_change_the_timetable():
+    cost = IntercityTransport().select("北京", "上海", "train")["Cost"].tolist()
+    data = WorldEnv()("intercity_transport_select('北京', '上海', 'train')")
+    with pytest.raises(ValueError):
+        data["whole_data"].loc[data["whole_data"].index[0], "Cost"] = 1
+    assert IntercityTransport().select("北京", "上海", "train")["Cost"].tolist() == cost
+    fresh = WorldEnv(cache_size=0)("intercity_transport_select('北京', '上海', 'train')")
+    assert fresh["whole_data"]["Cost"].tolist() == cost
@@ -0,0 +1,61 @@
+from functools import lru_cache
+
+import pytest
+
+from chinatravel.environment.tools.attractions.apis import Attractions
+from chinatravel.symbol_verification import concept_func
+from chinatravel.symbol_verification.plan_features import MEALS, PlanFeatures
+
+PLAN = {
+    "target_city": "上海",
+    "itinerary": [
+        {
+            "day": 1,
+            "activities": [
+                {"type": "attraction", "position": "上海景点1", "start_time": "09:00"},
+                {"type": "lunch", "position": "无此餐厅", "end_time": "次日01:30"},
+                "not an activity",
+                {"position": "no type"},
+            ],
+        }
+    ],
+}
+
+
+def test_activities():
+    features = PlanFeatures(PLAN, "上海")
+    types = [act.type for act in features.activities]
+    assert types == ["attraction", "lunch", None, None]
+    assert features.activities[0].start == 540 and features.activities[1].end == 90
+    assert [act.position for act in features.of_type(*MEALS)] == ["无此餐厅"]
+
+
+def test_lookup_is_remembered_per_plan():
+    features = PlanFeatures(PLAN, "上海")
+    rows = features.lookup("attraction", "上海景点1")
+    assert rows is features.lookup("attraction", "上海景点1") and not rows.empty
+    assert features.lookup("restaurant", "无此餐厅").empty
+    assert len(features._rows) == 2
+    # an unhashable name is looked up without being remembered
+    assert features.lookup("attraction", ["上海景点1"]).empty
+    assert len(features._rows) == 2
+
+
+def test_walk_error_is_raised_on_read():
+    broken = PlanFeatures({"itinerary": [{"day": 1}]}, "上海")
+    with pytest.raises(KeyError):
+        broken.activities
+
+
+def test_lookup_type_error_is_not_retried_uncached(monkeypatch):
+    calls = []
+
+    def failing(*args):
+        calls.append(args)
+        raise TypeError("inside the lookup")
+
+    monkeypatch.setattr(concept_func, "_first_value", failing)
+    monkeypatch.setattr(concept_func, "_cached_first_value", lru_cache()(failing))
+    with pytest.raises(TypeError):
+        concept_func._poi_field(Attractions, "上海", "上海景点1", "price")
+    assert len(calls) == 1
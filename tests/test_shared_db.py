@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from chinatravel.environment.sandbox_db import SandboxDatabase, read_only
+from chinatravel.environment.shared_db import SharedDatabase, SharedTables
+
+
+@pytest.fixture
+def table():
+    return pd.DataFrame(
+        {
+            "name": ["上海景点1", "上海景点2", ""],
+            "type": ["公园", "博物馆", "公园"],
+            "mixed": ["a", None, 1],
+            "price": [10.0, 0.0, 50.0],
+        }
+    )
+
+
+def test_attached_table_equals_published(table):
+    with SharedDatabase.publish({("table", "reader"): table}) as shared:
+        attached = SharedTables(shared.name).load("table", "reader")
+        assert attached.astype(object).equals(table.astype(object))
+        assert (attached["type"] == "公园").tolist() == [True, False, True]
+        assert attached["name"].str.contains("景点").tolist() == [True, True, False]
+        assert attached["mixed"].dtype == object
+
+
+def test_strings_are_attached_without_copying(table):
+    pytest.importorskip("pyarrow")
+    with SharedDatabase.publish({("table", "reader"): table}) as shared:
+        attached = SharedTables(shared.name).load("table", "reader")
+        assert attached["name"].dtype == pd.StringDtype("pyarrow_numpy")
+        data = attached["name"].array._pa_array.chunks[0].buffers()[2]
+        segment = SharedTables(shared.name)._segment(shared._segments[0].name)
+        start = np.frombuffer(segment.buf, np.uint8).ctypes.data
+        assert start <= data.address < start + segment.size
+
+
+def test_write_through_view_keeps_attached_strings(table):
+    with SharedDatabase.publish({("table", "reader"): table}) as shared:
+        attached = SharedTables(shared.name).load("table", "reader")
+        view = read_only(attached)
+        with pytest.raises(ValueError):
+            view.loc[0, "price"] = 1.0
+        view.loc[0, "name"] = "changed"
+        assert attached["name"].iloc[0] == "上海景点1"
+
+
+def test_publish_restores_the_registry_configuration():
+    db = SandboxDatabase.get_instance()
+    lazy, capacity, snapshot = db.lazy, db.capacity, db.use_snapshot
+    db.configure(lazy=True, capacity=7)
+    try:
+        with SharedDatabase.publish():
+            assert db.lazy and db.capacity == 7
+    finally:
+        db.configure(lazy=lazy, capacity=capacity, snapshot=snapshot)
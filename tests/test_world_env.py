@@ -0,0 +1,23 @@
+import pytest
+
+from chinatravel.environment.world_env import WorldEnv
+
+
+@pytest.fixture(scope="module")
+def env():
+    return WorldEnv()
+
+
+def test_view_of_shared_table_counts_nothing(env):
+    out = env("attractions_select('上海')")
+    assert out["success"] and len(out["whole_data"])
+    assert out.nbytes() == 0
+
+
+def test_owned_frame_counts_deeply(env):
+    out = env("attractions_select('上海', 'price', lambda x: x >= 0)")
+    data = out["whole_data"]
+    assert len(data)
+    shallow = data.memory_usage(index=True).sum()
+    assert out.nbytes() == data.memory_usage(index=True, deep=True).sum() > shallow
+    assert env.results.bytes >= out.nbytes()